@@ -0,0 +1,63 @@
+"""
+How long it takes a fresh python process to import drawBotGrid.
+
+Each case runs in its own interpreter, several times, and the median is reported
+next to a bare interpreter start. "everything" imports all the modules up front,
+which is what `import drawBotGrid` used to do.
+
+    python benchmarks/bench_import.py --repeat 20
+"""
+
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+repository = pathlib.Path(__file__).resolve().parent.parent
+
+cases = {
+    "python": "pass",
+    "import drawBotGrid": "import drawBotGrid",
+    "ColumnGrid": "from drawBotGrid import ColumnGrid",
+    "columnTextBox": "from drawBotGrid import columnTextBox",
+    "imageBox": "from drawBotGrid import imageBox",
+    "everything": "import drawBotGrid.grid, drawBotGrid.text, drawBotGrid.image, drawBotGrid.image_info, drawBotGrid.metrics, drawBotGrid.table",
+}
+
+
+def time_case(code, repeat):
+    environment = dict(os.environ, PYTHONPATH=str(repository), PYTHONDONTWRITEBYTECODE="1")
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=environment, check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def count_modules(code):
+    environment = dict(os.environ, PYTHONPATH=str(repository))
+    script = f"import sys; before = len(sys.modules); {code}; print(len(sys.modules) - before)"
+    output = subprocess.run([sys.executable, "-c", script], env=environment, check=True, capture_output=True, text=True)
+    return int(output.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'case':<20} {'median ms':>10} {'+ms':>8} {'modules':>8}")
+    for name, code in cases.items():
+        duration = time_case(code, args.repeat)
+        if baseline is None:
+            baseline = duration
+        print(f"{name:<20} {duration * 1000:>10.1f} {(duration - baseline) * 1000:>8.1f} {count_modules(code):>8}")
+
+
+if __name__ == "__main__":
+    main()
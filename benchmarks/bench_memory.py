@@ -0,0 +1,98 @@
+"""
+How much memory the grid and table objects take, measured with tracemalloc.
+
+Each case builds many objects, keeps them in a list, and reports the memory
+allocated per object (the list itself is not counted). Text is measured with
+the stub backend, so the table cases don't depend on fonts.
+
+    python benchmarks/bench_memory.py --count 100000
+"""
+
+import argparse
+import gc
+import pathlib
+import sys
+import tracemalloc
+
+repository = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repository))
+
+from drawBotGrid import drawingBackend
+from drawBotGrid.grid import ColumnGrid, Grid, BaselineGrid
+from drawBotGrid.table import Table, CellBox, TableRow
+
+
+def column_grid(i):
+    return ColumnGrid((float(i), 0.0, 1000.0, 800.0), 12, 10)
+
+
+def column_grid_with_edges(i):
+    columns = column_grid(i)
+    # the edges are computed on first access and kept
+    columns[0]
+    return columns
+
+
+def grid(i):
+    return Grid((float(i), 0.0, 1000.0, 800.0), 12, 8, 10, 10)
+
+
+def baseline_grid(i):
+    return BaselineGrid((float(i), 0.0, 1000.0, 800.0), 12)
+
+
+def grid_cell(i, grid=Grid((0, 0, 1000, 800), 100, 100)):
+    return grid.cell(i % 100, i // 100 % 100)
+
+
+def make_cases():
+    table = Table((0, 800, 500, 0), [{"a": "a", "b": "b"}], [{"title": "a", "width": 100}, {"title": "b"}])
+    return {
+        "ColumnGrid": column_grid,
+        "ColumnGrid, edges computed": column_grid_with_edges,
+        "Grid": grid,
+        "BaselineGrid": baseline_grid,
+        "Grid.cell": grid_cell,
+        "CellBox": lambda i: CellBox(table, (float(i), 0.0, 100.0, 12.0)),
+        "TableRow": lambda i: TableRow(table, ["a", "b"], float(i), 12.0),
+    }
+
+
+def measure(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before - sys.getsizeof(objects)) / count
+
+
+def measure_table(row_count):
+    items = [{"name": f"row {i}", "value": str(i)} for i in range(row_count)]
+    columns = [{"title": "name", "width": 100}, {"title": "value"}]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table = Table((0, 800, 500, 0), items, columns)
+    cells = [cell for row in table.cell_rects for cell in row]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    drawingBackend("stub")
+    print(f"{'case':<30} {'bytes per object':>18}")
+    for name, factory in make_cases().items():
+        print(f"{name:<30} {measure(factory, args.count):>18.1f}")
+    print(f"{'Table, per cell':<30} {measure_table(args.rows):>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
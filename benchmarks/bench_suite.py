@@ -0,0 +1,573 @@
+"""
+Timings of the grid arithmetic, text placement, tables and image boxes,
+at the scale of real documents.
+
+Everything is drawn and measured through a drawing backend, the stub one by
+default, so the suite runs headless and without fonts. Each benchmark is set
+up once, run once untimed (to import what it needs, numpy for instance), then
+run --repeat times; the metrics and image caches are cleared before each run,
+so every run measures the same work. The image processing benchmarks need
+Pillow, they are skipped without it.
+
+Results can be written to a json file, and compared with a previous one: the
+suite fails (exit status 1) when a benchmark got slower than the baseline by
+more than --threshold (or its own tolerance, for the noisier ones), and its fastest run is slower than the slowest run of
+the baseline by more than --min-delta: the runs of both results don't overlap.
+Timings are compared relative to a fixed amount of plain python work timed next
+to each run, and slower benchmarks are run again (--retries) before failing,
+so that the speed of a busy machine drifting doesn't fail it.
+
+    python benchmarks/bench_suite.py --output before.json
+    (change something)
+    python benchmarks/bench_suite.py --compare before.json --threshold 0.2
+
+--filter only runs the benchmarks whose name contains the given string,
+--scale shrinks (or grows) every fixture, for a quick check.
+"""
+
+import argparse
+import atexit
+import datetime
+import json
+import os
+import pathlib
+import platform
+import random
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+repository = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repository))
+
+from drawBotGrid import drawingBackend, getDrawingBackend, clearMetricsCache, clearImageInfoCache
+from drawBotGrid import ColumnGrid, Grid, BaselineGrid
+from drawBotGrid import baselineGridTextBox, columnTextBox, columnBaselineGridTextBox
+from drawBotGrid import imageBox, imageBoxLayout, imageCache, prepareImageBoxes
+from drawBotGrid.table import Table, StreamingTable
+
+# the size of the fixtures, multiplied by --scale
+scales = {
+    "columns": 1000,
+    "baselines": 10000,
+    "words": 100000,
+    "table_rows": 50000,
+    "images": 500,
+}
+
+benchmarks = {}
+# the slowdown --compare tolerates for noisier benchmarks, when it is more than --threshold
+tolerances = {}
+
+
+def benchmark(name, tolerance=None):
+    """
+    registers a benchmark. the decorated function sets it up,
+    and returns the function to time, or None if it can't run here.
+    benchmarks that write files or start processes vary more, they get a larger tolerance
+    """
+    def register(setup):
+        benchmarks[name] = setup
+        if tolerance is not None:
+            tolerances[name] = tolerance
+        return setup
+    return register
+
+
+# ----------------------------------------
+# fixtures
+
+
+def make_words(count, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for i in range(rng.randint(1, 12)))
+        for j in range(5000)
+    ]
+    return [rng.choice(vocabulary) for i in range(count)]
+
+
+def make_table_items(count, seed=0):
+    rng = random.Random(seed)
+    words = make_words(1000, seed)
+    return [
+        {
+            "name": " ".join(rng.choice(words) for j in range(rng.randint(1, 8))),
+            "quantity": rng.randint(0, 1000),
+            "price": rng.random() * 1000,
+        }
+        for i in range(count)
+    ]
+
+
+table_columns = [
+    {"title": "name"},
+    {"title": "quantity", "label": "qty", "width": 50},
+    {"title": "price", "width": 70, "format": ",.2f"},
+]
+
+
+def write_png(path, width, height):
+    """
+    a blank rgb png, only its header matters here
+    """
+    def chunk(chunk_type, data):
+        body = chunk_type + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    scanline = b"\x00" + b"\x00" * width * 3
+    with open(path, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+        png_file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        png_file.write(chunk(b"IDAT", zlib.compress(scanline * height)))
+        png_file.write(chunk(b"IEND", b""))
+
+
+def make_directory():
+    directory = tempfile.mkdtemp(prefix="drawBotGrid-bench-")
+    atexit.register(shutil.rmtree, directory, True)
+    return directory
+
+
+def make_images(count, seed=0, format="PNG"):
+    """
+    pngs are written by hand, jpegs (which are decoded with draft mode when resampled) need Pillow
+    """
+    directory = make_directory()
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        size = rng.randint(200, 1600), rng.randint(200, 1600)
+        if format == "PNG":
+            path = os.path.join(directory, f"image-{i}.png")
+            write_png(path, *size)
+        else:
+            from PIL import Image
+
+            path = os.path.join(directory, f"image-{i}.jpg")
+            Image.new("RGB", size, (i % 256, 128, 64)).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def page_frames(margin=40, page_size=(595, 842)):
+    """
+    the text frame of an endless stream of pages
+    """
+    width, height = page_size
+    while True:
+        getDrawingBackend().newPage(width, height)
+        yield (margin, margin, width - 2 * margin, height - 2 * margin)
+
+
+# ----------------------------------------
+# grids
+
+
+@benchmark("grid/column_grid_1k_columns")
+def column_grid_index():
+    count = scales["columns"]
+    spans = [i % 12 + 1 for i in range(count)]
+
+    def run():
+        for direction in ("ltr", "rtl"):
+            columns = ColumnGrid((0, 0, count * 30, 800), count, 10, direction)
+            for i in range(count):
+                columns[i]
+                columns[-i - 1]
+            columns.spans(spans)
+            list(columns)
+    return run
+
+
+@benchmark("grid/grid_1k_columns_cells")
+def grid_cells():
+    count = scales["columns"]
+
+    def run():
+        grid = Grid((0, 0, count * 30, 1000), count, 50, 10, 10)
+        grid.cells()
+        for i in range(count):
+            grid.cell(i, i % 50, 2, 1)
+    return run
+
+
+@benchmark("grid/baseline_grid_10k_lines")
+def baseline_grid_lookup():
+    count = scales["baselines"]
+    line_height = 12
+    height = count * line_height
+    rng = random.Random(0)
+    coordinates = [rng.uniform(0, height) for i in range(count)]
+
+    def run():
+        baselines = BaselineGrid((0, 0, 500, height), line_height)
+        list(baselines)
+        for y in coordinates:
+            baselines.closest_line_below_coordinate(y)
+            baselines.closest_line_above_coordinate(y)
+        baselines.closest_lines_below_coordinates(coordinates)
+    return run
+
+
+# ----------------------------------------
+# text
+
+
+@benchmark("text/baseline_grid_text_boxes")
+def baseline_grid_text_boxes():
+    # a paragraph of 100 words every 10 lines of the baseline grid
+    count = scales["baselines"]
+    line_height = 12
+    baselines = BaselineGrid((0, 0, 400, count * line_height), line_height)
+    words = make_words(count * 10)
+    paragraphs = [" ".join(words[i:i + 100]) for i in range(0, len(words), 1000)]
+
+    def run():
+        db = getDrawingBackend()
+        db.fontSize(9)
+        db.lineHeight(12)
+        for i, paragraph in enumerate(paragraphs):
+            top = baselines.top - i * 10 * line_height
+            baselineGridTextBox(paragraph, (0, top - 10 * line_height, 400, 10 * line_height), baselines)
+    return run
+
+
+@benchmark("text/column_text_100k_words")
+def column_text():
+    txt = " ".join(make_words(scales["words"]))
+
+    def run():
+        db = getDrawingBackend()
+        overflow = txt
+        for frame in page_frames():
+            db.fontSize(9)
+            db.lineHeight(11)
+            overflow = columnTextBox(overflow, frame, subdivisions=3, gutter=12)
+            if not overflow:
+                break
+    return run
+
+
+@benchmark("text/column_baseline_grid_text_100k_words")
+def column_baseline_grid_text():
+    txt = " ".join(make_words(scales["words"]))
+
+    def run():
+        db = getDrawingBackend()
+        overflow = txt
+        for frame in page_frames():
+            db.fontSize(9)
+            db.lineHeight(11)
+            baselines = BaselineGrid(frame, 11)
+            overflow = columnBaselineGridTextBox(overflow, frame, baselines, subdivisions=3, gutter=12)
+            if not overflow:
+                break
+    return run
+
+
+# ----------------------------------------
+# tables
+
+
+@benchmark("table/build_50k_rows")
+def table_build():
+    items = make_table_items(scales["table_rows"])
+
+    def run():
+        getDrawingBackend().fontSize(8)
+        # the rows are formatted and measured on first use
+        Table((40, 802, 515, 0), items, table_columns, base_row_height=12).actual_height
+    return run
+
+
+@benchmark("table/paginate_and_draw_50k_rows")
+def table_paginate():
+    items = make_table_items(scales["table_rows"])
+    getDrawingBackend().fontSize(8)
+    table = Table((40, 802, 515, 0), items, table_columns, base_row_height=12)
+    table.actual_height
+
+    def run():
+        getDrawingBackend().fontSize(8)
+        tables, overflow = table.paginate(page_frames())
+        for page in tables:
+            page.draw_rows_lines()
+            page.draw_content()
+    return run
+
+
+@benchmark("table/streaming_50k_rows")
+def table_streaming():
+    items = make_table_items(scales["table_rows"])
+
+    def run():
+        getDrawingBackend().fontSize(8)
+        table = StreamingTable((40, 802, 515, 0), items, table_columns, base_row_height=12)
+        for row in table.rows():
+            pass
+    return run
+
+
+# ----------------------------------------
+# images
+
+
+def image_placements(format="PNG"):
+    count = scales["images"]
+    # pages of 4 x 5 boxes, most images being used a few times
+    paths = make_images(max(1, count // 5), format=format)
+    grid = Grid((40, 40, 515, 762), 4, 5, 10, 10)
+    fittings = ["fit", "fill", "crop"]
+    anchors = [("left", "top"), ("center", "center"), ("right", "bottom")]
+    placements = []
+    for i in range(count):
+        cell = grid.cell(i % 4, i // 4 % 5)
+        placements.append((paths[i % len(paths)], cell, fittings[i % 3], anchors[i % 3]))
+    return placements
+
+
+@benchmark("image/layout_500_placements")
+def image_layout():
+    placements = image_placements()
+
+    def run():
+        # image sizes are read from the files again
+        clearImageInfoCache()
+        for path, box, fitting, anchor in placements:
+            imageBoxLayout(path, box, fitting=fitting, anchor=anchor)
+    return run
+
+
+@benchmark("image/draw_500_placements")
+def image_draw():
+    placements = image_placements()
+
+    def run():
+        clearImageInfoCache()
+        for i, (path, box, fitting, anchor) in enumerate(placements):
+            if i % 20 == 0:
+                getDrawingBackend().newPage(595, 842)
+            imageBox(path, box, fitting=fitting, anchor=anchor)
+    return run
+
+
+def image_processing_setup():
+    """
+    jpeg placements and an empty image cache, or None without Pillow
+    """
+    try:
+        import PIL
+    except ImportError:
+        return None
+    placements = image_placements(format="JPEG")
+    cache = imageCache(make_directory())
+    return placements, cache
+
+
+@benchmark("image/crop_pixels_500_placements", tolerance=0.5)
+def image_crop_pixels():
+    prepared = image_processing_setup()
+    if prepared is None:
+        return None
+    placements, cache = prepared
+
+    def run():
+        clearImageInfoCache()
+        cache.clear()
+        for path, box, fitting, anchor in placements:
+            imageBox(path, box, fitting=fitting, anchor=anchor, crop_pixels=True)
+    return run
+
+
+@benchmark("image/target_dpi_500_placements", tolerance=0.5)
+def image_target_dpi():
+    prepared = image_processing_setup()
+    if prepared is None:
+        return None
+    placements, cache = prepared
+
+    def run():
+        clearImageInfoCache()
+        cache.clear()
+        for path, box, fitting, anchor in placements:
+            imageBox(path, box, fitting=fitting, anchor=anchor, target_dpi=150)
+    return run
+
+
+@benchmark("image/prepare_image_boxes_500_placements", tolerance=0.5)
+def image_prepare_boxes():
+    prepared = image_processing_setup()
+    if prepared is None:
+        return None
+    placements, cache = prepared
+
+    def run():
+        clearImageInfoCache()
+        cache.clear()
+        for layout in prepareImageBoxes(placements, crop_pixels=True, target_dpi=150):
+            layout.draw()
+    return run
+
+
+# ----------------------------------------
+# running
+
+
+def calibrate():
+    """
+    a fixed amount of plain python work, timed next to each run.
+    the speed of a machine drifts over time (other processes, frequency scaling),
+    comparisons are made relative to it
+    """
+    start = time.perf_counter()
+    counts = {}
+    total = 0.0
+    for i in range(20000):
+        key = str(i % 500)
+        counts[key] = counts.get(key, 0) + 1
+        total += len(key) * 0.5
+    return time.perf_counter() - start
+
+
+def time_benchmark(setup, repeat):
+    """
+    the timings of a benchmark, None if it can't run here
+    """
+    backend = getDrawingBackend()
+    run = setup()
+    if run is None:
+        return None
+    durations = []
+    calibrations = []
+    # the first run is a warm up
+    for i in range(repeat + 1):
+        if hasattr(backend, "reset"):
+            # the stub backend records every call
+            backend.reset()
+        clearMetricsCache()
+        calibrations.append(calibrate())
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    durations = durations[1:]
+    return {
+        "calibration": min(calibrations[1:]),
+        "min": min(durations),
+        "max": max(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.mean(durations),
+        "repeat": repeat,
+    }
+
+
+def compare(results, baseline, threshold, min_delta=0.001, verbose=True):
+    """
+    returns the names of the benchmarks that are slower than the baseline by more than threshold
+    (0.2 being 20%, or their own tolerance if larger), and whose fastest run is slower than the slowest run of the baseline by min_delta seconds.
+    the fastest runs are the ones compared to the threshold, they are the least noisy.
+    the changes are printed if verbose
+    """
+    regressions = []
+    if verbose:
+        for key in ("backend", "scale"):
+            if results[key] != baseline.get(key):
+                print(f"warning: {key} is {results[key]!r}, it was {baseline.get(key)!r} in the baseline")
+        print(f"\n{'benchmark':<45} {'baseline ms':>12} {'ms':>10} {'change':>8}")
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before_result = baseline["benchmarks"][name]
+        # the baseline timings, at the speed the machine had when the benchmark ran now
+        speed = 1
+        if "calibration" in before_result:
+            speed = result["calibration"] / before_result["calibration"]
+        before = before_result["min"] * speed
+        after = result["min"]
+        change = after / before - 1
+        benchmark_threshold = max(threshold, tolerances.get(name, 0))
+        # results written before max was recorded only have the median
+        slowest_before = before_result.get("max", before_result["median"]) * speed
+        flag = ""
+        if change > benchmark_threshold and after > slowest_before + min_delta:
+            regressions.append(name)
+            flag = "  slower"
+        elif change > benchmark_threshold:
+            flag = "  within noise"
+        if verbose:
+            print(f"{name:<45} {before * 1000:>12.1f} {after * 1000:>10.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def relative_time(result):
+    return result["min"] / result["calibration"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="stub", help="stub, skia or drawbot")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--filter", default="", help="only run the benchmarks whose name contains this")
+    parser.add_argument("--output", help="writes the results to this json file")
+    parser.add_argument("--compare", help="a json file of previous results")
+    parser.add_argument("--threshold", type=float, default=0.2, help="the slowdown that fails --compare, 0.2 being 20%%")
+    parser.add_argument("--min-delta", type=float, default=0.001, help="the smallest slowdown that fails --compare, in seconds")
+    parser.add_argument("--retries", type=int, default=2, help="how many times slower benchmarks are run again before --compare fails")
+    args = parser.parse_args()
+
+    for key in scales:
+        scales[key] = max(1, int(scales[key] * args.scale))
+    drawingBackend(args.backend)
+
+    results = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "scale": args.scale,
+        "benchmarks": {},
+    }
+    print(f"{'benchmark':<45} {'min ms':>10} {'median ms':>10}")
+    for name, setup in benchmarks.items():
+        if args.filter not in name:
+            continue
+        result = time_benchmark(setup, args.repeat)
+        if result is None:
+            print(f"{name:<45} {'skipped':>10}")
+            continue
+        results["benchmarks"][name] = result
+        print(f"{name:<45} {result['min'] * 1000:>10.1f} {result['median'] * 1000:>10.1f}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        # a slow period of the machine can last longer than the runs of a benchmark,
+        # slower benchmarks are run again, and their fastest runs kept
+        for i in range(args.retries):
+            regressions = compare(results, baseline, args.threshold, args.min_delta, verbose=False)
+            if not regressions:
+                break
+            for name in regressions:
+                print(f"{name:<45} running again")
+                result = time_benchmark(benchmarks[name], args.repeat)
+                if relative_time(result) < relative_time(results["benchmarks"][name]):
+                    results["benchmarks"][name] = result
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than the baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
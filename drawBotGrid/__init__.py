@@ -1,3 +1,38 @@
-from .grid import ColumnGrid, RowGrid, Grid, BaselineGrid
-from .text import baselineGridTextBox, verticalAlignTextBox, baselineHeight, columnTextBox, columnBaselineGridTextBox, textOverflowTestMode
-from .image import imageBox, imageAtSize
\ No newline at end of file
+import importlib
+
+# the public names and the modules they come from.
+# modules are only imported when one of their names is first used (PEP 562),
+# so that importing drawBotGrid for grid arithmetic doesn't load the text and image code
+_exports = {
+    "grid": ["ColumnGrid", "RowGrid", "Grid", "BaselineGrid"],
+    "text": ["baselineGridTextBox", "verticalAlignTextBox", "baselineHeight", "columnTextBox", "columnBaselineGridTextBox", "textOverflowTestMode", "textOverflowTest", "fitTextToBox", "fitColumnTextBox",
+             "baselineGridTextBoxLayout", "verticalAlignTextBoxLayout", "columnTextBoxLayout", "columnBaselineGridTextBoxLayout"],
+    "image": ["imageBox", "imageAtSize", "imageCache", "imageResolution", "imageBoxLayout", "prepareImageBoxes"],
+    "image_info": ["imageInfo", "prewarmImageInfo", "clearImageInfoCache"],
+    "metrics": ["metricsCacheEnabled", "clearMetricsCache", "metricsCacheInfo"],
+    "backends": ["drawingBackend", "getDrawingBackend"],
+}
+
+_modules_by_name = {name: module_name for module_name, names in _exports.items() for name in names}
+
+__all__ = list(_modules_by_name)
+
+# drawBotGrid.grid, drawBotGrid.table... work without importing them first
+_submodules = ("backends", "geometry", "grid", "image", "image_cache", "image_info", "image_processing", "metrics", "table", "text")
+
+
+def __getattr__(name):
+    module_name = _modules_by_name.get(name)
+    if module_name is None:
+        if name in _submodules:
+            # importing a submodule sets it as an attribute of the package
+            return importlib.import_module("." + name, __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    # the next lookups don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_submodules))
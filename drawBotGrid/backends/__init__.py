@@ -0,0 +1,128 @@
+import importlib
+import os
+
+"""
+drawBotGrid draws and measures through a backend: the drawBot module by default,
+drawbot-skia (which runs on Linux and Windows), or a recording stub that draws nothing.
+
+The rest of the package uses the db object below as if it were the drawBot module,
+every call goes to the current backend. The backend is picked with
+set_drawing_backend, or with the DRAWBOTGRID_BACKEND environment variable
+("drawbot", "skia" or "stub"). Otherwise drawBot is used if it is installed,
+then drawbot-skia.
+"""
+
+# ----------------------------------------
+
+_backend_classes = {
+    "drawbot": ("drawbot", "DrawBotBackend"),
+    "skia": ("skia", "SkiaBackend"),
+    "stub": ("stub", "StubBackend"),
+}
+
+_backend = None
+
+
+def load_backend(name):
+    """
+    a new backend, by name
+    """
+    try:
+        module_name, class_name = _backend_classes[name.lower()]
+    except KeyError:
+        raise ValueError(f"unknown drawing backend {name!r}, use one of {', '.join(_backend_classes)}")
+    module = importlib.import_module("." + module_name, __name__)
+    return getattr(module, class_name)()
+
+
+def set_drawing_backend(backend):
+    """
+    backend is "drawbot", "skia", "stub" or a backend object.
+    returns the backend
+    """
+    global _backend
+    if isinstance(backend, str):
+        backend = load_backend(backend)
+    _backend = backend
+    return _backend
+
+
+drawingBackend = set_drawing_backend
+
+
+def get_drawing_backend():
+    global _backend
+    if _backend is None:
+        _backend = _load_default_backend()
+    return _backend
+
+
+getDrawingBackend = get_drawing_backend
+
+
+def _load_default_backend():
+    name = os.environ.get("DRAWBOTGRID_BACKEND")
+    if name:
+        return load_backend(name)
+    for name in ("drawbot", "skia"):
+        try:
+            return load_backend(name)
+        except ImportError:
+            pass
+    raise ImportError(
+        "drawBotGrid needs drawBot or drawbot-skia to draw, "
+        "set DRAWBOTGRID_BACKEND=stub to run without any"
+    )
+
+
+class _BackendProxy:
+    """
+    stands for the drawBot module, forwarding everything to the current backend
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_drawing_backend(), name)
+
+    def __repr__(self):
+        return f"<drawing backend proxy for {get_drawing_backend()!r}>"
+
+
+db = _BackendProxy()
+
+# ----------------------------------------
+
+
+def freeze(value):
+    """
+    a hashable version of value, for font state keys
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+_paper_sizes = {
+    "A3": (842, 1191),
+    "A4": (595, 842),
+    "A5": (420, 595),
+    "Letter": (612, 792),
+    "Legal": (612, 1008),
+    "Tabloid": (792, 1224),
+}
+
+
+def get_page_size(width, height=None):
+    """
+    (width, height) from drawBot style page sizes: two numbers, or a paper name like "A4" or "LetterLandscape"
+    """
+    if isinstance(width, str):
+        name = width
+        landscape = name.endswith("Landscape")
+        if landscape:
+            name = name[: -len("Landscape")]
+        width, height = _paper_sizes[name]
+        if landscape:
+            width, height = height, width
+    return width, height
@@ -0,0 +1,69 @@
+from . import freeze
+
+"""
+The drawBot backend, which is the drawBot module itself.
+"""
+
+# ----------------------------------------
+
+# the FormattedString attributes that have an influence on text measurements
+# fontNumber is the index of the face in a .ttc/.otc collection,
+# named instances of variable fonts are applied as fontVariations
+_font_state_attributes = (
+    "font",
+    "fontNumber",
+    "fallbackFont",
+    "fontSize",
+    "lineHeight",
+    "tracking",
+    "baselineShift",
+    "openTypeFeatures",
+    "fontVariations",
+    "language",
+    "writingDirection",
+    "tabs",
+    "indent",
+    "tailIndent",
+    "firstLineIndent",
+    "paragraphTopSpacing",
+    "paragraphBottomSpacing",
+)
+
+
+class DrawBotBackend:
+    name = "drawbot"
+
+    def __init__(self, module=None):
+        if module is None:
+            import drawBot as module
+        self.module = module
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def __repr__(self):
+        return "<DrawBotBackend>"
+
+    def font_state_key(self, exclude=()):
+        """
+        a hashable snapshot of the current font settings,
+        or None if they can't be read (the cache is then bypassed)
+        """
+        # drawBot keeps the current text settings on the state of its measuring context
+        try:
+            state = self.module._drawBotDrawingTool._dummyContext._state
+            text_state = state.text
+        except AttributeError:
+            return None
+
+        key = (self.name,) + tuple(
+            (name, freeze(getattr(text_state, "_" + name, None)))
+            for name in _font_state_attributes
+            if name not in exclude
+        )
+        key += (("hyphenation", getattr(state, "hyphenation", None)),)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
@@ -0,0 +1,130 @@
+import re
+
+"""
+Text boxes for backends that can only measure and draw single lines of text.
+Lines are broken greedily on white space, words longer than a line are broken
+between characters, and every line is lineHeight below the previous one.
+"""
+
+# ----------------------------------------
+
+_word_pattern = re.compile(r"\S+\s*|\s+")
+
+
+def break_lines(txt, width, text_width):
+    """
+    the (start, end) indexes of the lines of txt in a box of width,
+    text_width(string) being the width of a single line
+    """
+    lines = []
+    widths = {}
+
+    def measure(string):
+        if string not in widths:
+            widths[string] = text_width(string)
+        return widths[string]
+
+    paragraph_start = 0
+    for paragraph in txt.split("\n"):
+        paragraph_end = paragraph_start + len(paragraph)
+        line_start = paragraph_start
+        line_width = 0
+        for match in _word_pattern.finditer(paragraph):
+            word = match.group()
+            word_start = paragraph_start + match.start()
+            # trailing spaces hang outside the box
+            word_width = measure(word.rstrip())
+            if word_start > line_start and line_width + word_width > width:
+                lines.append((line_start, word_start))
+                line_start = word_start
+                line_width = 0
+            # a word that doesn't fit on a line of its own is broken anywhere
+            while word_width > width and len(word.rstrip()) > 1:
+                cut = _longest_fitting_prefix(word.rstrip(), width, measure)
+                lines.append((line_start, line_start + cut))
+                line_start += cut
+                word = word[cut:]
+                word_width = measure(word.rstrip())
+            line_width += word_width + measure(word) - measure(word.rstrip())
+        lines.append((line_start, paragraph_end))
+        # skip the line break
+        paragraph_start = paragraph_end + 1
+    return lines
+
+
+def _longest_fitting_prefix(word, width, measure):
+    low, high = 1, len(word)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if measure(word[:middle]) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class TextBoxLayoutMixin:
+    """
+    textBox, textBoxBaselines, textOverflow and textSize on top of:
+    _text_width(txt), the width of a single line,
+    _font_metrics(), the (ascender, descender, cap height) of the current font, descender being negative,
+    _line_height(), the current lineHeight,
+    _draw_line(txt, (x, y)), drawing a single line
+    """
+
+    def _lay_out_box(self, txt, box, align=None):
+        """
+        returns the (line, x, y) that fit in box, and the text that doesn't
+        """
+        txt = str(txt)
+        x, y, w, h = box
+        ascender, descender, cap_height = self._font_metrics()
+        line_height = self._line_height()
+        # the first line is half the leading below the top of the box
+        top = y + h
+        first_baseline = top - (line_height - ascender + descender) / 2 - ascender
+
+        lines = []
+        for i, (start, end) in enumerate(break_lines(txt, w, self._text_width)):
+            if top - (i + 1) * line_height < y - 1e-9:
+                return lines, txt[start:]
+            line = txt[start:end].rstrip()
+            line_x = x
+            if align in ("center", "right"):
+                remaining_width = w - self._text_width(line)
+                line_x += remaining_width / 2 if align == "center" else remaining_width
+            lines.append((line, line_x, first_baseline - i * line_height))
+        return lines, ""
+
+    def textBox(self, txt, box, align=None):
+        lines, overflow = self._lay_out_box(txt, box, align)
+        for line, x, y in lines:
+            if line:
+                self._draw_line(line, (x, y))
+        return overflow
+
+    def textBoxBaselines(self, txt, box, align=None):
+        lines, overflow = self._lay_out_box(txt, box, align)
+        return [(x, y) for line, x, y in lines]
+
+    def textOverflow(self, txt, box, align=None):
+        lines, overflow = self._lay_out_box(txt, box, align)
+        return overflow
+
+    def textSize(self, txt, align=None, width=None, height=None):
+        txt = str(txt)
+        if width is None:
+            lines = txt.split("\n")
+        else:
+            lines = [txt[start:end].rstrip() for start, end in break_lines(txt, width, self._text_width)]
+        text_width = max(self._text_width(line) for line in lines)
+        return text_width, len(lines) * self._line_height()
+
+    def fontCapHeight(self):
+        return self._font_metrics()[2]
+
+    def fontAscender(self):
+        return self._font_metrics()[0]
+
+    def fontDescender(self):
+        return self._font_metrics()[1]
@@ -0,0 +1,93 @@
+import os
+from . import freeze, get_page_size
+from .layout import TextBoxLayoutMixin
+
+"""
+The drawbot-skia backend. drawbot-skia follows the drawBot api for drawing,
+but only knows about single lines of text: text boxes are laid out here,
+with the line breaking of backends.layout.
+"""
+
+# ----------------------------------------
+
+
+class SkiaBackend(TextBoxLayoutMixin):
+    name = "skia"
+
+    def __init__(self, module=None):
+        if module is None:
+            from drawbot_skia import drawbot as module
+        self.module = module
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def __repr__(self):
+        return "<SkiaBackend>"
+
+    @property
+    def _text_style(self):
+        return self.module._db._gstate.textStyle
+
+    def font_state_key(self, exclude=()):
+        text_style = self._text_style
+        return (self.name,) + tuple(
+            (name, freeze(getattr(text_style, attribute)))
+            for name, attribute in (
+                ("font", "font"),
+                ("fontSize", "fontSize"),
+                ("lineHeight", "lineHeight"),
+                ("openTypeFeatures", "features"),
+                ("fontVariations", "variations"),
+                ("language", "language"),
+            )
+            if name not in exclude
+        )
+
+    # ----------------------------------------
+    # pages
+
+    def size(self, width, height=None):
+        self.module.size(*get_page_size(width, height))
+
+    def newPage(self, width=None, height=None):
+        if width is None:
+            self.module.newPage()
+        else:
+            self.module.newPage(*get_page_size(width, height))
+
+    # ----------------------------------------
+    # text
+
+    def _text_width(self, txt):
+        if not txt:
+            return 0
+        return self.module.textSize(txt)[0]
+
+    def _font_metrics(self):
+        font_metrics = self._text_style.skFont.getMetrics()
+        # skia measures downwards
+        return -font_metrics.fAscent, -font_metrics.fDescent, font_metrics.fCapHeight
+
+    def _line_height(self):
+        return self._text_style.getLineHeight()
+
+    def _draw_line(self, txt, position):
+        self.module.text(txt, position)
+
+    def fontLineHeight(self):
+        return self._text_style.skFont.getSpacing()
+
+    # ----------------------------------------
+    # images
+
+    def imageSize(self, path):
+        from ..image_info import read_image_info
+        info = None
+        if isinstance(path, (str, os.PathLike)) and os.path.isfile(path):
+            info = read_image_info(path)
+        if info is not None:
+            return info.size
+        import skia
+        dimensions = skia.Image.open(path).dimensions()
+        return dimensions.width(), dimensions.height()
@@ -0,0 +1,210 @@
+import contextlib
+import copy
+from . import freeze, get_page_size
+from .layout import TextBoxLayoutMixin
+
+"""
+A backend that draws nothing. Drawing calls are recorded in calls, and text is
+measured with simple font metrics proportional to the font size (every character
+being advance_ratio * fontSize wide), so that layouts can be computed and checked
+without any rendering engine.
+"""
+
+# ----------------------------------------
+
+
+class StubBackend(TextBoxLayoutMixin):
+    name = "stub"
+
+    def __init__(self, advance_ratio=0.5, ascender_ratio=0.75, descender_ratio=-0.25, cap_height_ratio=0.7):
+        self.advance_ratio = advance_ratio
+        self.ascender_ratio = ascender_ratio
+        self.descender_ratio = descender_ratio
+        self.cap_height_ratio = cap_height_ratio
+        self.reset()
+
+    def __repr__(self):
+        return "<StubBackend>"
+
+    def reset(self):
+        self.calls = []
+        self.page_size = (1000, 1000)
+        self.state = {
+            "font": None,
+            "fontSize": 10,
+            "lineHeight": None,
+            "tracking": 0,
+            "openTypeFeatures": {},
+            "fontVariations": {},
+            "language": None,
+            "hyphenation": False,
+            "fill": (0,),
+            "stroke": None,
+            "strokeWidth": 1,
+        }
+        self._states = []
+
+    def _record(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+
+    def font_state_key(self, exclude=()):
+        return (self.name,) + tuple(
+            (name, freeze(self.state[name]))
+            for name in ("font", "fontSize", "lineHeight", "tracking", "openTypeFeatures", "fontVariations", "language", "hyphenation")
+            if name not in exclude
+        )
+
+    # ----------------------------------------
+    # pages
+
+    def size(self, width, height=None):
+        self.page_size = get_page_size(width, height)
+
+    def newPage(self, width=None, height=None):
+        if width is not None:
+            self.page_size = get_page_size(width, height)
+        self._record("newPage", *self.page_size)
+
+    def width(self):
+        return self.page_size[0]
+
+    def height(self):
+        return self.page_size[1]
+
+    def saveImage(self, path, **kwargs):
+        self._record("saveImage", path, **kwargs)
+
+    # ----------------------------------------
+    # state
+
+    @contextlib.contextmanager
+    def savedState(self):
+        self._states.append(copy.deepcopy(self.state))
+        self._record("save")
+        try:
+            yield
+        finally:
+            self.state = self._states.pop()
+            self._record("restore")
+
+    def _setter(name):
+        def setter(self, *values):
+            self.state[name] = values[0] if len(values) == 1 else values
+        setter.__name__ = name
+        return setter
+
+    fill = _setter("fill")
+    stroke = _setter("stroke")
+    strokeWidth = _setter("strokeWidth")
+    fontSize = _setter("fontSize")
+    lineHeight = _setter("lineHeight")
+    tracking = _setter("tracking")
+    language = _setter("language")
+    hyphenation = _setter("hyphenation")
+    del _setter
+
+    def font(self, name, fontSize=None):
+        self.state["font"] = name
+        if fontSize is not None:
+            self.state["fontSize"] = fontSize
+
+    def openTypeFeatures(self, *args, resetFeatures=False, **features):
+        if resetFeatures:
+            self.state["openTypeFeatures"] = {}
+        self.state["openTypeFeatures"] = dict(self.state["openTypeFeatures"], **features)
+
+    def fontVariations(self, *args, resetVariations=False, **variations):
+        if resetVariations:
+            self.state["fontVariations"] = {}
+        self.state["fontVariations"] = dict(self.state["fontVariations"], **variations)
+
+    def translate(self, x=0, y=0):
+        self._record("translate", x, y)
+
+    def scale(self, x=1, y=None, center=(0, 0)):
+        self._record("scale", x, x if y is None else y)
+
+    def rotate(self, angle, center=(0, 0)):
+        self._record("rotate", angle)
+
+    # ----------------------------------------
+    # shapes and images
+
+    def rect(self, x, y, w, h):
+        self._record("rect", x, y, w, h)
+
+    def oval(self, x, y, w, h):
+        self._record("oval", x, y, w, h)
+
+    def line(self, point1, point2):
+        self._record("line", point1, point2)
+
+    def BezierPath(self):
+        return StubBezierPath()
+
+    def clipPath(self, path=None):
+        self._record("clipPath", path)
+
+    def image(self, path, position, alpha=1, pageNumber=None):
+        self._record("image", path, position, alpha=alpha)
+
+    def imageSize(self, path):
+        from ..image_info import read_image_info
+        info = read_image_info(path)
+        if info is None:
+            raise ValueError(f"the stub backend can't read the size of {path!r}")
+        return info.size
+
+    # ----------------------------------------
+    # text
+
+    def _text_width(self, txt):
+        font_size = self.state["fontSize"]
+        return len(txt) * (font_size * self.advance_ratio + self.state["tracking"])
+
+    def _font_metrics(self):
+        font_size = self.state["fontSize"]
+        return (font_size * self.ascender_ratio,
+                font_size * self.descender_ratio,
+                font_size * self.cap_height_ratio)
+
+    def _line_height(self):
+        if self.state["lineHeight"] is not None:
+            return self.state["lineHeight"]
+        return self.fontLineHeight()
+
+    def _draw_line(self, txt, position):
+        self._record("text", txt, position)
+
+    def text(self, txt, position, align=None):
+        x, y = position
+        if align in ("center", "right"):
+            width = self._text_width(str(txt))
+            x -= width / 2 if align == "center" else width
+        self._draw_line(str(txt), (x, y))
+
+    def fontLineHeight(self):
+        return self.state["fontSize"] * 1.2
+
+
+class StubBezierPath:
+    def __init__(self):
+        self.commands = []
+
+    def __repr__(self):
+        return f"<StubBezierPath {self.commands}>"
+
+    def rect(self, x, y, w, h):
+        self.commands.append(("rect", x, y, w, h))
+
+    def oval(self, x, y, w, h):
+        self.commands.append(("oval", x, y, w, h))
+
+    def moveTo(self, point):
+        self.commands.append(("moveTo", point))
+
+    def lineTo(self, point):
+        self.commands.append(("lineTo", point))
+
+    def closePath(self):
+        self.commands.append(("closePath",))
@@ -0,0 +1,801 @@
+from array import array
+from collections import namedtuple
+import math
+import numbers
+
+"""
+The arithmetic of the grids, without any drawing: nothing here imports drawBot
+or reads the state of a page, the page size is given when it is needed.
+drawBotGrid.grid adds drawing on top of these classes.
+"""
+
+# ----------------------------------------
+
+_numpy = None
+
+
+def _get_numpy():
+    """
+    numpy is optional, it is only imported the first time a vectorized helper needs it.
+    returns None if numpy is not installed
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+# ----------------------------------------
+
+
+class Rect(namedtuple("Rect", "x y width height")):
+    """
+    a (x, y, width, height) tuple, with named fields
+    """
+
+    __slots__ = ()
+
+
+# ----------------------------------------
+
+
+class AbstractArea:
+    """
+    this is mostly a possize, margin manager
+    """
+
+    __slots__ = ("_x", "_y", "_width", "_height")
+
+    def __init__(self, possize):
+        self._x, self._y, self._width, self._height = possize
+
+    @classmethod
+    def from_margins(cls, margins, page_size, *args, **kwargs):
+        """
+        margins are (left, bottom, right, top), negative values being inside the page,
+        page_size is a (width, height) tuple
+        """
+        left_margin, bottom_margin, right_margin, top_margin = margins
+        page_width, page_height = page_size
+        possize = (
+            -left_margin,
+            -bottom_margin,
+            page_width + left_margin + right_margin,
+            page_height + bottom_margin + top_margin,
+        )
+        return cls(possize, *args, **kwargs)
+
+    @property
+    def possize(self):
+        return Rect(self._x, self._y, self._width, self._height)
+
+    @possize.setter
+    def possize(self, possize):
+        self._x, self._y, self._width, self._height = possize
+
+    @property
+    def x(self):
+        return self._x
+
+    @property
+    def y(self):
+        return self._y
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def top(self):
+        """
+        the absolute y value of the top of the grid
+        """
+        return self._y + self._height
+
+    @property
+    def bottom(self):
+        """
+        the absolute y value of the bottom of the grid
+        """
+        return self.y
+
+    @property
+    def left(self):
+        """
+        the absolute x value of the left of the grid
+        """
+        return self.x
+
+    @property
+    def right(self):
+        """
+        the absolute x value of the right of the grid
+        """
+        return self.x + self.width
+
+    @property
+    def center(self):
+        return self.horizontal_center, self.vertical_center
+
+    @property
+    def horizontal_center(self):
+        return self.x + self.width / 2
+
+    @property
+    def vertical_center(self):
+        return self.y + self.height / 2
+
+
+# ----------------------------------------
+
+
+class AbstractGutterGrid(AbstractArea):
+    """
+    this is meant to be subclassed by Columns and Grid
+
+    the edges of the subdivisions are computed once, the first time they are needed,
+    and kept until one of the attributes they depend on is assigned again
+    """
+
+    __slots__ = ("subdivisions", "gutter", "direction", "_geometry")
+
+    _geometry_attributes = frozenset(
+        ("_x", "_y", "_width", "_height", "subdivisions", "gutter", "direction")
+    )
+
+    def __init__(self, possize, subdivisions=8, gutter=10, direction="ltr"):
+        super().__init__(possize)
+        self.subdivisions = subdivisions
+        self.gutter = gutter
+        self.direction = direction
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self._geometry_attributes:
+            super().__setattr__("_geometry", None)
+
+    def _get_geometry(self):
+        geometry = self._geometry
+        if geometry is None:
+            geometry = self._geometry = _GutterGridGeometry(
+                self._start_point,
+                self._end_point,
+                self.subdivisions,
+                self.gutter,
+                getattr(self, "direction", "ltr") == "rtl",
+            )
+        return geometry
+
+    # ----------------------------------------
+
+    @property
+    def _start_point(self):
+        raise NotImplementedError
+
+    @property
+    def _end_point(self):
+        raise NotImplementedError
+
+    # ----------------------------------------
+
+    @property
+    def _reference_dimension(self):
+        return self._end_point - self._start_point
+
+    @property
+    def subdivision_dimension(self):
+        """
+        the absolute dimension of a single subdivision within the grid
+        """
+        return self._get_geometry().subdivision_dimension
+
+    def span(self, span):
+        """
+        the absolute dimension of a span of consecutive subdivisions within the grid,
+        including their inbetween gutters.
+        span can also be a sequence or an array of spans, see spans()
+        """
+        if not isinstance(span, numbers.Real):
+            return self.spans(span)
+        geometry = self._get_geometry()
+
+        # Calculate the absolute span
+        if span >= 0:
+            absolute_span = geometry.subdivision_dimension * span + self.gutter * (
+                math.ceil(span) - 1
+            )
+        else:
+            absolute_span = geometry.subdivision_dimension * span + self.gutter * (
+                math.ceil(span) + 1
+            )
+
+        # In RTL mode, reverse the direction of spans
+        if geometry.rtl:
+            # In RTL mode, we want to reverse the direction of spans
+            # Positive spans should draw leftward (negative width)
+            # Negative spans should draw rightward (positive width)
+            return -absolute_span
+        else:
+            return absolute_span
+
+    def spans(self, spans):
+        """
+        the absolute dimensions of several spans at once.
+        returns an array if numpy is installed, a list otherwise
+        """
+        np = _get_numpy()
+        if np is None:
+            return [self.span(span) for span in spans]
+
+        spans = np.asarray(spans, dtype=float)
+        geometry = self._get_geometry()
+        ceiled_spans = np.ceil(spans)
+        gutter_counts = np.where(spans >= 0, ceiled_spans - 1, ceiled_spans + 1)
+        absolute_spans = geometry.subdivision_dimension * spans + self.gutter * gutter_counts
+        if geometry.rtl:
+            return -absolute_spans
+        return absolute_spans
+
+    def edges(self):
+        """
+        the start and end edges of every subdivision, by index,
+        as a (starts, ends) pair: (lefts, rights) for columns, (bottoms, tops) for rows.
+        starts are always lower than ends, whatever the direction of the grid.
+        returns arrays if numpy is installed, lists otherwise
+        """
+        geometry = self._get_geometry()
+        np = _get_numpy()
+        if np is None:
+            starts = list(geometry.start_edges)
+            if geometry.rtl:
+                starts.reverse()
+            ends = [start + geometry.subdivision_dimension for start in starts]
+        else:
+            starts = np.array(geometry.start_edges, dtype=float)
+            if geometry.rtl:
+                starts = starts[::-1].copy()
+            ends = starts + geometry.subdivision_dimension
+        return starts, ends
+
+    # ----------------------------------------
+
+    def _get_left_edge(self, index):
+        """
+        Always returns the left edge of a column, regardless of direction.
+        Used for drawing the grid visualization.
+        """
+        geometry = self._get_geometry()
+        if geometry.rtl:
+            # In RTL mode, map the index but always return left edge
+            if index >= 0:
+                return geometry.start_edge(self.subdivisions - 1 - index)
+            else:
+                return geometry.start_edge(-index - 1)
+        else:
+            # LTR mode: same as __getitem__
+            if index >= 0:
+                return geometry.start_edge(index)
+            else:
+                return geometry.end_edge(-index - 1)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+
+        elif isinstance(key, int):
+            index = key
+            geometry = self._get_geometry()
+            if geometry.rtl:
+                # RTL mode: reverse indexing
+                if index >= 0:
+                    # For positive indices in RTL, return RIGHT edge of the mapped column
+                    # This way rect(columns[0], y, columns*3, h) works correctly
+                    # columns*3 will be negative, so it draws leftward from the right edge
+                    left_edge = geometry.start_edge(self.subdivisions - 1 - index)
+                    return left_edge + geometry.subdivision_dimension  # Return right edge
+                else:
+                    # For negative indices in RTL, return LEFT edge of the mapped column
+                    # This way rect(columns[-1], y, columns*-3, h) works correctly
+                    # columns*-3 will be positive, so it draws rightward from the left edge
+                    return geometry.start_edge(-index - 1)
+            else:
+                # LTR mode: original behavior
+                if index >= 0:
+                    return geometry.start_edge(index)
+                else:
+                    return geometry.end_edge(-index - 1)
+
+    def __len__(self):
+        return self.subdivisions
+
+    def __iter__(self):
+        geometry = self._get_geometry()
+        if geometry.rtl:
+            return iter(
+                [
+                    edge + geometry.subdivision_dimension
+                    for edge in reversed(geometry.start_edges)
+                ]
+            )
+        return iter(geometry.start_edges)
+
+    def __mul__(self, factor):
+        return self.span(factor)
+
+
+class _GutterGridGeometry:
+    """
+    the precomputed edges of a gutter grid.
+    start_edges[i] is the start of the i-th subdivision, counting from the start point,
+    end_edges[i] is the end of the i-th subdivision, counting back from the end point.
+    edges are computed with the exact same arithmetic as the on the fly version,
+    indexes outside of the grid are still extrapolated
+    """
+
+    __slots__ = ("start", "end", "rtl", "subdivision_dimension", "step", "start_edges", "end_edges")
+
+    def __init__(self, start, end, subdivisions, gutter, rtl):
+        self.start = start
+        self.end = end
+        self.rtl = rtl
+        self.subdivision_dimension = (
+            (end - start) - ((subdivisions - 1) * gutter)
+        ) / subdivisions
+        self.step = gutter + self.subdivision_dimension
+        self.start_edges = array(
+            "d", [start + index * self.step for index in range(subdivisions)]
+        )
+        self.end_edges = array(
+            "d", [end + (-index) * self.step for index in range(subdivisions)]
+        )
+
+    def start_edge(self, index):
+        if 0 <= index < len(self.start_edges):
+            return self.start_edges[index]
+        return self.start + index * self.step
+
+    def end_edge(self, index):
+        if 0 <= index < len(self.end_edges):
+            return self.end_edges[index]
+        return self.end + (-index) * self.step
+
+
+# ----------------------------------------
+
+
+class ColumnGrid(AbstractGutterGrid):
+    """
+    Will return coordinates according to a column based grid.
+
+    Columns are refered to by index, accessing a column index will return its absolute x coordinate in the page.
+
+    ```
+    my_columns = Columns((50, 50, 900, 900), 8, 10)
+    print(my_columns[3])
+    > 505.0
+    ```
+
+    Negative indexes refer the right part of a column, starting from the right of the page.
+
+    ```
+    my_columns = Columns((50, 50, 900, 900), 8, 10)
+    print(my_columns[-2])
+    > 798.33
+    ```
+
+    The grid can return the total width of a span of consecutive columns, including the related inbween gutters
+
+    ```
+    my_columns = Columns((50, 50, 900, 900), 8, 10)
+    print(my_columns.span(4))
+    > 596.66
+    ```
+
+    The whole point is to use this as coordinate helpers to draw shapes of course
+
+    ```
+    my_columns = Columns((50, 50, 900, 900), 8, 10)
+    fill(0, 1, 0, .5)
+    rect(my_columns[1], my_columns.bottom, my_columns.span(3), my_columns.height)
+    fill(1, 0, 0, .5)
+    rect(my_columns[0], my_columns.top, my_columns.span(3), -200)
+    rect(my_columns[2], my_columns.top-200, my_columns.span(1), -200)
+    rect(my_columns[5], my_columns.top-400, my_columns.span(2), -200)
+    ```
+
+    """
+
+    __slots__ = ()
+
+    @property
+    def columns(self):
+        return self.subdivisions
+
+    @property
+    def column_width(self):
+        return self.subdivision_dimension
+
+    # @property
+    # def _reference_dimension(self):
+    #     return self.width
+
+    @property
+    def _start_point(self):
+        return self.left
+
+    @property
+    def _end_point(self):
+        return self.right
+
+
+# ----------------------------------------
+
+
+class RowGrid(AbstractGutterGrid):
+    """
+    To be documented :)
+    """
+
+    __slots__ = ()
+
+    @property
+    def rows(self):
+        return self.subdivisions
+
+    @property
+    def row_height(self):
+        return self.subdivision_dimension
+
+    # @property
+    # def _reference_dimension(self):
+    #     return self.height
+
+    @property
+    def _start_point(self):
+        return self.bottom
+
+    @property
+    def _end_point(self):
+        return self.top
+
+
+# ----------------------------------------
+
+
+class Grid(AbstractGutterGrid):
+    """
+    this is meant to be subclassed by Columns and Grid
+
+    columns and rows are made with column_grid_class and row_grid_class
+    """
+
+    __slots__ = ("columns", "rows")
+
+    column_grid_class = ColumnGrid
+    row_grid_class = RowGrid
+
+    def __init__(
+        self,
+        possize,
+        column_subdivisions=8,
+        row_subdivisions=8,
+        column_gutter=10,
+        row_gutter=10,
+        direction="ltr",
+    ):
+        self._x, self._y, self._width, self._height = possize
+        self.direction = direction
+        self.columns = self.column_grid_class(
+            possize, column_subdivisions, column_gutter, direction
+        )
+        self.rows = self.row_grid_class(possize, row_subdivisions, row_gutter)
+
+    @AbstractGutterGrid.possize.setter
+    def possize(self, possize):
+        self._x, self._y, self._width, self._height = possize
+        self.columns.possize = possize
+        self.rows.possize = possize
+
+    # ----------------------------------------
+
+    @property
+    def _reference_dimension(self):
+        return self.width, self.height
+
+    @property
+    def _start_point(self):
+        return self.left, self.bottom
+
+    @property
+    def _end_point(self):
+        return self.right, self.top
+
+    # ----------------------------------------
+    @property
+    def column_width(self):
+        return self.columns.column_width
+
+    @property
+    def row_height(self):
+        return self.rows.row_height
+
+    @property
+    def subdivision_dimension(self):
+        """
+        the absolute dimension of a single subdivision within the grid
+        """
+        return self.column_width, self.row_height
+
+    def column_span(self, span):
+        return self.columns.span(span)
+
+    def row_span(self, span):
+        return self.rows.span(span)
+
+    def span(self, column_span_row_span):
+        """
+        the absolute dimension of a span of consecutive subdivision within the grid, including their inbetween gutters
+        """
+        assert len(column_span_row_span) == 2
+        column_span, row_span = column_span_row_span
+        return self.column_span(column_span), self.row_span(row_span)
+
+    # ----------------------------------------
+
+    def __getitem__(self, index):
+        assert len(index) == 2
+        return self.columns[index[0]], self.rows[index[1]]
+
+    def __len__(self):
+        return len(self.columns) * len(self.rows)
+
+    def __iter__(self):
+        rows = list(self.rows)
+        return iter([(c, r) for c in self.columns for r in rows])
+
+    def cell(self, column, row, column_span=1, row_span=1):
+        """
+        the Rect of the cell at (column, row), spanning column_span columns and row_span rows.
+        its x and y are columns[column] and rows[row], its width and height the spans
+        """
+        return Rect(
+            self.columns[column],
+            self.rows[row],
+            self.columns.span(column_span),
+            self.rows.span(row_span),
+        )
+
+    def cells(self):
+        """
+        the edges of every cell as a (lefts, bottoms, rights, tops) tuple.
+        with numpy, each item is an array of shape (columns, rows), so lefts[i, j] is the left of cell (i, j).
+        without numpy, each item is a nested list, indexed as lefts[i][j]
+        """
+        lefts, rights = self.columns.edges()
+        bottoms, tops = self.rows.edges()
+        np = _get_numpy()
+        if np is None:
+            row_count = len(bottoms)
+            return (
+                [[left] * row_count for left in lefts],
+                [list(bottoms) for left in lefts],
+                [[right] * row_count for right in rights],
+                [list(tops) for right in rights],
+            )
+        lefts, bottoms = np.meshgrid(lefts, bottoms, indexing="ij")
+        rights, tops = np.meshgrid(rights, tops, indexing="ij")
+        return lefts, bottoms, rights, tops
+
+
+# ----------------------------------------
+
+
+class BaselineGrid(AbstractArea):
+    """ """
+
+    __slots__ = ("input_possize", "line_height")
+
+    def __init__(self, possize, line_height):
+        self.input_possize = possize
+        super().__init__(possize)
+        self.line_height = line_height
+
+    # ----------------------------------------
+
+    @property
+    def _start_point(self):
+        return self.top
+
+    @property
+    def _end_point(self):
+        return self.y
+
+    @property
+    def bottom(self):
+        """
+        the absolute y value of the bottom of the grid
+        """
+        # bottom matches the last visible line, it may not be equal self.y
+        return self[-1]
+
+    @property
+    def height(self):
+        """
+        height is overwritten with the actual distance from last to first line
+        """
+        return self.top - self.bottom
+
+    # ----------------------------------------
+
+    @property
+    def _reference_dimension(self):
+        return self._end_point - self._start_point
+
+    @property
+    def subdivisions(self):
+        return abs(int(self._reference_dimension // self.subdivision_dimension)) + 1
+
+    @property
+    def subdivision_dimension(self):
+        """
+        the absolute dimension of a single subdivision within the grid
+        """
+        return -self.line_height
+
+    def span(self, span):
+        """
+        the absolute dimension of a span of consecutive subdivisions within the grid,
+        including their inbetween gutters
+        """
+        return span * self.subdivision_dimension
+
+    # ----------------------------------------
+
+    def _first_index_below(self, y_coordinate, inclusive=True):
+        """
+        the index of the first line, counting from the top, that is below y_coordinate
+        (or at y_coordinate if inclusive), None if there is no such line
+        """
+        start = self._start_point
+        step = self.subdivision_dimension
+        if inclusive:
+            index = math.ceil((start - y_coordinate) / self.line_height)
+        else:
+            index = math.floor((start - y_coordinate) / self.line_height) + 1
+        index = max(index, 0)
+
+        # the estimate may be one line off because of float rounding,
+        # lines are compared exactly as self[index] computes them
+        if index > 0 and _is_below(start + (index - 1) * step, y_coordinate, inclusive):
+            index -= 1
+        elif not _is_below(start + index * step, y_coordinate, inclusive):
+            index += 1
+
+        if index >= self.subdivisions:
+            return None
+        return index
+
+    def baseline_index_from_coordinate(self, y_coordinate):
+        return self._first_index_below(y_coordinate, inclusive=True)
+
+    def closest_line_below_coordinate(self, y_coordinate):
+        index = self._first_index_below(y_coordinate, inclusive=True)
+        if index is not None:
+            return self._start_point + index * self.subdivision_dimension
+
+    def closest_line_above_coordinate(self, y_coordinate):
+        index = self._first_index_below(y_coordinate, inclusive=False)
+        if index is not None:
+            return (
+                self._start_point + index * self.subdivision_dimension + self.line_height
+            )
+
+    # ----------------------------------------
+    # batch versions of the lookups above.
+    # they return arrays with numpy, lists without it,
+    # using -1 as index and nan as line when there is no match in both cases
+
+    def _first_indexes_below(self, y_coordinates, inclusive=True):
+        np = _get_numpy()
+        y_coordinates = np.asarray(y_coordinates, dtype=float)
+        start = self._start_point
+        step = self.subdivision_dimension
+        if inclusive:
+            compare = np.greater_equal
+            indexes = np.ceil((start - y_coordinates) / self.line_height)
+        else:
+            compare = np.greater
+            indexes = np.floor((start - y_coordinates) / self.line_height) + 1
+        indexes = np.maximum(indexes, 0).astype(int)
+
+        previous = indexes - 1
+        step_back = (previous >= 0) & compare(y_coordinates, start + previous * step)
+        indexes = np.where(step_back, previous, indexes)
+        step_forward = ~compare(y_coordinates, start + indexes * step)
+        indexes = np.where(step_forward, indexes + 1, indexes)
+
+        indexes[indexes >= self.subdivisions] = -1
+        return indexes
+
+    def _lines_from_indexes(self, indexes, offset=0):
+        np = _get_numpy()
+        lines = self._start_point + indexes * self.subdivision_dimension + offset
+        return np.where(indexes >= 0, lines, np.nan)
+
+    def baseline_indexes_from_coordinates(self, y_coordinates):
+        """
+        baseline_index_from_coordinate for each y coordinate, -1 where there is no line
+        """
+        if _get_numpy() is None:
+            return [_index_or_missing(self.baseline_index_from_coordinate(y)) for y in y_coordinates]
+        return self._first_indexes_below(y_coordinates, inclusive=True)
+
+    def closest_lines_below_coordinates(self, y_coordinates):
+        """
+        closest_line_below_coordinate for each y coordinate, nan where there is no line
+        """
+        if _get_numpy() is None:
+            return [_line_or_missing(self.closest_line_below_coordinate(y)) for y in y_coordinates]
+        indexes = self._first_indexes_below(y_coordinates, inclusive=True)
+        return self._lines_from_indexes(indexes)
+
+    def closest_lines_above_coordinates(self, y_coordinates):
+        """
+        closest_line_above_coordinate for each y coordinate, nan where there is no line
+        """
+        if _get_numpy() is None:
+            return [_line_or_missing(self.closest_line_above_coordinate(y)) for y in y_coordinates]
+        indexes = self._first_indexes_below(y_coordinates, inclusive=False)
+        return self._lines_from_indexes(indexes, offset=self.line_height)
+
+    # ----------------------------------------
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+
+        elif isinstance(key, int):
+            index = key
+            if index >= 0:
+                return self._start_point + index * self.subdivision_dimension
+            else:
+                return (
+                    self._start_point
+                    + len(self) * self.subdivision_dimension
+                    + index * self.subdivision_dimension
+                )
+
+    def __len__(self):
+        return self.subdivisions
+
+    def __iter__(self):
+        return iter([self.__getitem__(i) for i in range(self.subdivisions)])
+
+    def __mul__(self, factor):
+        return self.span(factor)
+
+
+# ----------------------------------------
+
+
+def _is_below(line, y_coordinate, inclusive):
+    if inclusive:
+        return y_coordinate >= line
+    return y_coordinate > line
+
+
+def _index_or_missing(index):
+    # the batch lookups use the same markers as their numpy versions
+    return -1 if index is None else index
+
+
+def _line_or_missing(line):
+    return math.nan if line is None else line
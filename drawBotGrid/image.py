@@ -1,7 +1,9 @@
-import drawBot as db
-import pathlib
-import tempfile
-import PIL
+from .backends import db
+from .image_cache import ImageCache
+from .image_info import image_info, image_size
+from .image_processing import process_image
+import math
+import os
 
 def image_at_size(path, box, preserve_proprotions=True):
     """
@@ -10,7 +12,7 @@ def image_at_size(path, box, preserve_proprotions=True):
     aligning it somewhere esle that bottom, left...
     """
     x, y, w, h = box
-    actual_w, actual_h = db.imageSize(path)
+    actual_w, actual_h = image_size(path)
     if not w:
         scale_ratio_w = h / actual_h
         scale_ratio_h = h / actual_h
@@ -35,73 +37,207 @@ imageAtSize = image_at_size
 
 # ----------------------------------------
 
+class ImageBoxLayout:
+    """
+    an image placed in a box, with its geometry and processed image (if any) worked out,
+    but not drawn yet. rect is the (x, y, w, h) the image covers
+    """
+
+    def __init__(self, path, box, rect, translation, scale, clip_rect=None, draw_box_frame=False, image_kwargs=None):
+        self.path = path
+        self.box = box
+        self.rect = rect
+        self.translation = translation
+        self.scale = scale
+        self.clip_rect = clip_rect
+        self.draw_box_frame = draw_box_frame
+        self.image_kwargs = image_kwargs or {}
+
+    def draw(self):
+        with db.savedState():
+            if self.clip_rect is not None:
+                clip_path = db.BezierPath()
+                clip_path.rect(*self.clip_rect)
+                db.clipPath(clip_path)
+            db.translate(*self.translation)
+            db.scale(*self.scale)
+            db.image(self.path, (0, 0), **self.image_kwargs)
+
+        if self.draw_box_frame:
+            grid_color =  (.5, 0, .8, 1)
+            with db.savedState():
+                db.strokeWidth(.5)
+                db.fill(None)
+                db.stroke(*grid_color)
+                db.rect(*self.box)
+
+        return self.rect
+
+# ----------------------------------------
+
 def image_box(path,
              box,
              fitting="fit",
              scale=1,
              anchor=("left", "top"),
              draw_box_frame=False,
+             crop_pixels=False,
+             target_dpi=None,
+             max_pixels=None,
              **kwargs):
+    """
+    by default, the part of the image outside of the box is clipped away when drawing,
+    nothing is decoded or written to disk.
+    crop_pixels=True crops the image pixels instead, so that only the visible part is embedded,
+    the crop is kept in the image cache, see set_image_cache.
+
+    target_dpi downsamples the visible part to that resolution at its drawn size (in points),
+    max_pixels caps the number of pixels embedded for the box.
+    they default to the values given to set_image_resolution.
+    images are never upsampled. only local png, jpeg, tiff and gif files are cropped or resampled,
+    pdfs, eps, urls and ImageObjects are always clipped
+    """
+    layout = image_box_layout(path, box, fitting=fitting, scale=scale, anchor=anchor,
+                              draw_box_frame=draw_box_frame, crop_pixels=crop_pixels,
+                              target_dpi=target_dpi, max_pixels=max_pixels, **kwargs)
+    return layout.draw()
+
+imageBox = image_box
+
+def image_box_layout(path,
+                     box,
+                     fitting="fit",
+                     scale=1,
+                     anchor=("left", "top"),
+                     draw_box_frame=False,
+                     crop_pixels=False,
+                     target_dpi=None,
+                     max_pixels=None,
+                     **kwargs):
+    """
+    same as image_box, but returns an ImageBoxLayout to draw later
+    """
+    layout, job = _plan_image_box(path, box, fitting=fitting, scale=scale, anchor=anchor,
+                                  draw_box_frame=draw_box_frame, crop_pixels=crop_pixels,
+                                  target_dpi=target_dpi, max_pixels=max_pixels, **kwargs)
+    if job is not None:
+        _run_image_jobs([job], max_workers=0)
+    return layout
+
+imageBoxLayout = image_box_layout
+
+_placement_arguments = ("path", "box", "fitting", "anchor", "scale")
+
+def prepare_image_boxes(placements, max_workers=None, executor=None, **kwargs):
+    """
+    the ImageBoxLayouts of many placements at once,
+    with the image processing (crop_pixels, target_dpi, max_pixels) done in a process pool.
+    placements are (path, box, fitting, anchor, scale) tuples, the last ones being optional,
+    or dictionaries of image_box arguments. kwargs apply to all placements.
+    max_workers=0 processes the images in the current process,
+    an existing concurrent.futures executor can be given instead
+    """
+    layouts = []
+    jobs = {}
+    for placement in placements:
+        if isinstance(placement, dict):
+            arguments = dict(kwargs, **placement)
+        else:
+            arguments = dict(kwargs, **dict(zip(_placement_arguments, placement)))
+        layout, job = _plan_image_box(**arguments)
+        layouts.append(layout)
+        # several placements can share the same processed image
+        if job is not None:
+            jobs[job[1]] = job
+    _run_image_jobs(list(jobs.values()), max_workers=max_workers, executor=executor)
+    return layouts
+
+prepareImageBoxes = prepare_image_boxes
+
+def _plan_image_box(path,
+                    box,
+                    fitting="fit",
+                    scale=1,
+                    anchor=("left", "top"),
+                    draw_box_frame=False,
+                    crop_pixels=False,
+                    target_dpi=None,
+                    max_pixels=None,
+                    **kwargs):
+    """
+    returns the ImageBoxLayout, and the processing job to run before drawing it or None.
+    nothing is decoded here
+    """
 
     assert fitting in ("fit", "fill", "crop")
 
-    im_path = pathlib.Path(path)
-    with tempfile.NamedTemporaryFile(suffix=im_path.suffix, delete=False) as im_cropped:
+    x, y, w, h = box
+    
+    # get the scale ratio
+    image_w, image_h = image_size(path)
+    scale_ratio_w = w / image_w
+    scale_ratio_h = h / image_h
+    if fitting == "fit":
+        scale_ratio = min(scale_ratio_w, scale_ratio_h)
+    elif fitting == "fill":
+        scale_ratio = max(scale_ratio_w, scale_ratio_h)
+    elif fitting == "crop":        
+        scale_ratio = scale
 
-        x, y, w, h = box
-        
-        # get the scale ratio
-        image_w, image_h = db.imageSize(path)
-        scale_ratio_w = w / image_w
-        scale_ratio_h = h / image_h
-        if fitting == "fit":
-            scale_ratio = min(scale_ratio_w, scale_ratio_h)
-        elif fitting == "fill":
-            scale_ratio = max(scale_ratio_w, scale_ratio_h)
-        elif fitting == "crop":        
-            scale_ratio = scale
-
-        crop_width, crop_height = _crop_image_with_anchor(path, im_cropped.name, anchor, w/scale_ratio, h/scale_ratio)
-
-        im_width, im_height = db.imageSize(im_cropped.name)
-        im_width_scaled = im_width*scale_ratio
-        im_height_scaled = im_height*scale_ratio
-        anchor_x, anchor_y = anchor
-
-        if anchor_x == "left":
-            offset_x = x
-        elif anchor_x == "right":
-            offset_x = x + w - im_width_scaled
-        elif anchor_x == "center":
-            offset_x = x + (w - im_width_scaled)/2
-
-        assert anchor_y in ("center", "bottom", "top")
-        if anchor_y == "bottom":
-            offset_y = y
-        elif anchor_y == "top":
-            offset_y = y + h - im_height_scaled
-        elif anchor_y == "center":
-            offset_y = y + (h - im_height_scaled)/2
+    crop_x, crop_y, crop_width, crop_height = _get_crop_rect_with_anchor((image_w, image_h), anchor, w/scale_ratio, h/scale_ratio)
 
-        with db.savedState():
-            db.translate(offset_x, offset_y)
-            db.scale(scale_ratio, scale_ratio)
-            db.image(im_cropped.name, (0, 0), **kwargs)
+    im_width_scaled = crop_width*scale_ratio
+    im_height_scaled = crop_height*scale_ratio
+    anchor_x, anchor_y = anchor
 
-        if draw_box_frame:
-            grid_color =  (.5, 0, .8, 1)
-            with db.savedState():
-                db.strokeWidth(.5)
-                db.fill(None)
-                db.stroke(*grid_color)
-                db.rect(*box)
+    if anchor_x == "left":
+        offset_x = x
+    elif anchor_x == "right":
+        offset_x = x + w - im_width_scaled
+    elif anchor_x == "center":
+        offset_x = x + (w - im_width_scaled)/2
+
+    assert anchor_y in ("center", "bottom", "top")
+    if anchor_y == "bottom":
+        offset_y = y
+    elif anchor_y == "top":
+        offset_y = y + h - im_height_scaled
+    elif anchor_y == "center":
+        offset_y = y + (h - im_height_scaled)/2
 
-        return offset_x, offset_y, crop_width*scale_ratio, crop_height*scale_ratio
+    rect = (offset_x, offset_y, im_width_scaled, im_height_scaled)
+    crop_rect = (crop_x, crop_y, crop_width, crop_height)
+    output_size = None
+    can_process = _is_raster_file(path)
+    if can_process:
+        output_size = _get_output_size(crop_width, crop_height, scale_ratio, target_dpi, max_pixels)
+
+    job = None
+    if can_process and (output_size is not None or crop_pixels):
+        output_path, cached = _get_image_cache().lookup(path, ("crop", crop_rect, output_size))
+        if not cached:
+            job = (path, output_path, crop_rect, output_size)
+        if output_size is not None:
+            output_width, output_height = output_size
+            draw_scale = (scale_ratio * crop_width / output_width, scale_ratio * crop_height / output_height)
+        else:
+            draw_scale = (scale_ratio, scale_ratio)
+        layout = ImageBoxLayout(str(output_path), box, rect, (offset_x, offset_y), draw_scale,
+                                draw_box_frame=draw_box_frame, image_kwargs=kwargs)
+    else:
+        layout = ImageBoxLayout(path, box, rect,
+                                (offset_x - crop_x*scale_ratio, offset_y - crop_y*scale_ratio),
+                                (scale_ratio, scale_ratio), clip_rect=rect,
+                                draw_box_frame=draw_box_frame, image_kwargs=kwargs)
+    return layout, job
 
-def _crop_image_with_anchor(input_path, output_path, anchor, crop_width, crop_height):
+def _get_crop_rect_with_anchor(image_size, anchor, crop_width, crop_height):
+    """
+    the (x, y, w, h) part of the image to show, in image pixels, from the bottom left of the image
+    """
     
     anchor_x, anchor_y = anchor
-    im_width, im_height = db.imageSize(input_path)
+    im_width, im_height = image_size
 
     crop_width = min(crop_width, im_width)
     crop_height = min(crop_height, im_height)
@@ -120,16 +256,110 @@ def _crop_image_with_anchor(input_path, output_path, anchor, crop_width, crop_he
     elif anchor_y == "center":
         crop_y = (im_height - crop_height)/2
 
-    ## moving through PIL here
-    ## as drawBot imageObject.crop 
-    ## seems to produce blurred borders
-
     crop_x = min(crop_x, im_width)
     crop_y = min(crop_y, im_height)
-    im = PIL.Image.open(input_path)
-    im = im.crop((crop_x, crop_y, crop_x+crop_width, crop_y+crop_height))
-    im.save(output_path)
-    return crop_width, crop_height
+    return crop_x, crop_y, crop_width, crop_height
+
+# ----------------------------------------
+
+_default_target_dpi = None
+_default_max_pixels = None
+
+def set_image_resolution(target_dpi=None, max_pixels=None):
+    """
+    the default target_dpi and max_pixels of image_box, None means no limit
+    """
+    global _default_target_dpi, _default_max_pixels
+    _default_target_dpi = target_dpi
+    _default_max_pixels = max_pixels
+
+imageResolution = set_image_resolution
+
+def _get_output_size(crop_width, crop_height, scale_ratio, target_dpi=None, max_pixels=None):
+    """
+    the pixel size the visible part of the image should be resampled to,
+    or None if it is already small enough
+    """
+    if target_dpi is None:
+        target_dpi = _default_target_dpi
+    if max_pixels is None:
+        max_pixels = _default_max_pixels
+
+    # drawBot units are points, 72 per inch
+    ratio = 1
+    if target_dpi:
+        ratio = min(ratio, scale_ratio * target_dpi / 72)
+    if max_pixels:
+        ratio = min(ratio, math.sqrt(max_pixels / (crop_width * crop_height)))
+    if ratio >= 1:
+        return None
+    output_width = max(1, int(crop_width * ratio))
+    output_height = max(1, int(crop_height * ratio))
+    if output_width >= crop_width and output_height >= crop_height:
+        return None
+    return output_width, output_height
+
+_raster_formats = ("PNG", "JPEG", "TIFF", "GIF")
+
+def _is_local_file(path):
+    # urls and ImageObjects are left to drawBot
+    return isinstance(path, (str, os.PathLike)) and os.path.isfile(path)
+
+def _is_raster_file(path):
+    # vector images and unknown formats are left to drawBot too, PIL can't decode them
+    return _is_local_file(path) and image_info(path).format in _raster_formats
+
+# ----------------------------------------
+
+_image_cache = None
+_temp_directory = None
+_temp_image_cache = None
+
+def set_image_cache(directory, max_size=2 * 1024**3, hash_content=False):
+    """
+    keeps the images processed by image_box (crop_pixels, target_dpi, max_pixels) in directory,
+    so that they are reused across pages, runs and processes.
+    sources are recognized by path, size and modification time, or by content if hash_content is True.
+    None goes back to the default, a temporary directory removed when python exits
+    """
+    global _image_cache
+    if directory is None:
+        _image_cache = None
+    else:
+        _image_cache = ImageCache(directory, max_size=max_size, hash_content=hash_content)
+    return _image_cache
+
+imageCache = set_image_cache
+
+def _get_image_cache():
+    global _temp_directory, _temp_image_cache
+    if _image_cache is not None:
+        return _image_cache
+    if _temp_image_cache is None:
+        import tempfile
+        # drawBot only reads images when the document is saved,
+        # so processed images have to outlive image_box
+        _temp_directory = tempfile.TemporaryDirectory(prefix="drawBotGrid-")
+        _temp_image_cache = ImageCache(_temp_directory.name, max_size=None)
+    return _temp_image_cache
+
+def _run_image_jobs(jobs, max_workers=None, executor=None):
+    if not jobs:
+        return
+    cache = _get_image_cache()
+    if executor is None and (max_workers == 0 or len(jobs) == 1):
+        for job in jobs:
+            cache.stored(process_image(*job))
+        return
+
+    if executor is None:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            _run_image_jobs(jobs, executor=executor)
+        return
+    futures = [executor.submit(process_image, *job) for job in jobs]
+    for future in futures:
+        cache.stored(future.result())
 
 # def _get_image_offset_in_box(im, box, anchor):
 #     x, y, w, h = box
@@ -151,5 +381,3 @@ def _crop_image_with_anchor(input_path, output_path, anchor, crop_width, crop_he
 #         offset_y = y + (h - im_height)/2
 
 #     return (offset_x, offset_y)
-
-imageBox = image_box
\ No newline at end of file
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import pathlib
+
+"""
+A directory of processed images (crops, resamples...) that can be shared
+between pages, runs and processes.
+
+Entries are named after the source image (its path, size and modification time,
+or the hash of its content) and the processing applied to it, so an image is only
+processed again if it changes. Entries are written under a temporary name then
+renamed, so other processes never see a partial file. Once the directory grows
+over max_size bytes, the least recently used entries are removed, except the
+ones used by the current process: drawBot only reads images when the document
+is saved, so they must still be there by then.
+"""
+
+# ----------------------------------------
+
+
+class ImageCache:
+    # the directory is only scanned for eviction every few writes
+    eviction_interval = 32
+
+    def __init__(self, directory, max_size=2 * 1024**3, hash_content=False):
+        self.directory = pathlib.Path(directory).expanduser()
+        self.max_size = max_size
+        self.hash_content = hash_content
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._content_hashes = {}
+        self._used_paths = set()
+
+    def source_key(self, path):
+        path = pathlib.Path(path).resolve()
+        stat = path.stat()
+        stat_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if not self.hash_content:
+            return stat_key
+        # hashing is only done once per version of the file
+        content_hash = self._content_hashes.get(stat_key)
+        if content_hash is None:
+            digest = hashlib.sha1()
+            with path.open("rb") as image_file:
+                for block in iter(lambda: image_file.read(1024 * 1024), b""):
+                    digest.update(block)
+            content_hash = self._content_hashes[stat_key] = digest.hexdigest()
+        return content_hash
+
+    def path_for(self, source_path, parameters, suffix=None):
+        key = repr((self.source_key(source_path), parameters))
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        if suffix is None:
+            suffix = pathlib.Path(source_path).suffix
+        return self.directory / (name + suffix)
+
+    def get(self, source_path, parameters, render, suffix=None):
+        """
+        returns the path of the processed version of source_path described by parameters,
+        render(output_path) is only called to create it if it is not cached yet
+        """
+        output_path, cached = self.lookup(source_path, parameters, suffix=suffix)
+        if not cached:
+            write_atomically(output_path, render)
+            self.stored(output_path)
+        return output_path
+
+    def lookup(self, source_path, parameters, suffix=None):
+        """
+        returns (output_path, cached).
+        when it is not cached, output_path is where the processed image should be written,
+        by write_atomically, then reported with stored
+        """
+        output_path = self.path_for(source_path, parameters, suffix=suffix)
+        self._used_paths.add(str(output_path))
+        if output_path.exists():
+            self.hits += 1
+            # the modification time is used as the last access time for eviction
+            try:
+                os.utime(output_path)
+            except OSError:
+                pass
+            return output_path, True
+        self.misses += 1
+        return output_path, False
+
+    def stored(self, output_path):
+        self._writes_since_eviction += 1
+        if self._writes_since_eviction >= self.eviction_interval:
+            self.evict()
+
+    def evict(self):
+        self._writes_since_eviction = 0
+        if self.max_size is None or not self.directory.exists():
+            return
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            # temporary files are being written by someone
+            if entry.name.startswith(".tmp-") or not entry.is_file():
+                continue
+            if entry.path in self._used_paths:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        if self.directory.exists():
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.startswith(".tmp-"):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            "directory": str(self.directory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_size": self.max_size,
+        }
+
+
+def write_atomically(output_path, render):
+    """
+    calls render(temp_path) next to output_path, then renames the result to output_path,
+    so that no one ever reads a partially written file
+    """
+    import tempfile
+
+    output_path = pathlib.Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=output_path.parent, prefix=".tmp-", suffix=output_path.suffix
+    )
+    os.close(file_descriptor)
+    try:
+        render(temp_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
@@ -0,0 +1,343 @@
+import os
+import pathlib
+import re
+import struct
+import threading
+
+"""
+Image dimensions, EXIF orientation and resolution, read from the file headers
+only: laying out images never needs to decode their pixels. Results are kept
+in memory per path and modification time. Files this module can't read are
+measured by the drawing backend instead.
+"""
+
+# ----------------------------------------
+
+
+class ImageInfo:
+    """
+    width and height are in pixels as stored in the file (in points for pdfs),
+    which is how drawBot draws them.
+    orientation is the EXIF orientation, from 1 to 8, 1 being upright.
+    dpi is a (x, y) tuple, or None if the file doesn't say
+    """
+
+    def __init__(self, width, height, format=None, orientation=1, dpi=None):
+        self.width = width
+        self.height = height
+        self.format = format
+        self.orientation = orientation
+        self.dpi = dpi
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def oriented_size(self):
+        """
+        the size once the EXIF orientation is applied
+        """
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+    def __repr__(self):
+        return f"<ImageInfo {self.format} {self.width}x{self.height} orientation={self.orientation} dpi={self.dpi}>"
+
+
+# ----------------------------------------
+
+_info_cache = {}
+_info_cache_lock = threading.Lock()
+
+
+def image_info(path):
+    """
+    the ImageInfo of the image at path.
+    urls and ImageObjects are measured by the drawing backend and not cached
+    """
+    if not isinstance(path, (str, os.PathLike)) or not os.path.isfile(path):
+        width, height = _db_image_size(path)
+        return ImageInfo(width, height)
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _info_cache_lock:
+        info = _info_cache.get(key)
+    if info is not None:
+        return info
+
+    info = read_image_info(path)
+    if info is None:
+        width, height = _db_image_size(path)
+        info = ImageInfo(width, height)
+    with _info_cache_lock:
+        _info_cache[key] = info
+    return info
+
+
+imageInfo = image_info
+
+
+def image_size(path):
+    """
+    same as db.imageSize, from the file header when possible
+    """
+    return image_info(path).size
+
+
+def clear_image_info_cache():
+    with _info_cache_lock:
+        _info_cache.clear()
+
+
+clearImageInfoCache = clear_image_info_cache
+
+_image_suffixes = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".gif", ".pdf"}
+
+
+def prewarm_image_info(paths, max_workers=None, recursive=False):
+    """
+    reads the headers of many images at once, with a thread pool.
+    paths is a directory or a list of image paths.
+    returns a {path: ImageInfo} dictionary
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        directory = pathlib.Path(paths)
+        candidates = directory.rglob("*") if recursive else directory.iterdir()
+        paths = [
+            str(path)
+            for path in candidates
+            if path.suffix.lower() in _image_suffixes and path.is_file()
+        ]
+    import concurrent.futures
+
+    paths = list(paths)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        infos = executor.map(image_info, paths)
+        return dict(zip(paths, infos))
+
+
+prewarmImageInfo = prewarm_image_info
+
+
+def _db_image_size(path):
+    from .backends import db
+
+    return db.imageSize(path)
+
+
+# ----------------------------------------
+
+
+def read_image_info(path):
+    """
+    parses the header of a png, jpeg, tiff, gif or pdf file,
+    returns None for anything else
+    """
+    with open(path, "rb") as image_file:
+        head = image_file.read(32)
+        image_file.seek(0)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return _read_png(image_file)
+            if head.startswith(b"\xff\xd8"):
+                return _read_jpeg(image_file)
+            if head[:4] in (b"II*\x00", b"MM\x00*"):
+                return _read_tiff(_file_reader(image_file), "TIFF")
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                width, height = struct.unpack("<HH", head[6:10])
+                return ImageInfo(width, height, "GIF")
+            if head.startswith(b"%PDF"):
+                return _read_pdf(image_file)
+        except (struct.error, ValueError, IndexError):
+            pass
+    return None
+
+
+def _read_png(image_file):
+    image_file.seek(8)
+    info = None
+    while True:
+        chunk_header = image_file.read(8)
+        if len(chunk_header) < 8:
+            return info
+        length, chunk_type = struct.unpack(">I4s", chunk_header)
+        if chunk_type == b"IHDR":
+            width, height = struct.unpack(">II", image_file.read(8))
+            info = ImageInfo(width, height, "PNG")
+            length -= 8
+        elif chunk_type == b"pHYs":
+            x, y, unit = struct.unpack(">IIB", image_file.read(9))
+            # unit 1 is the meter
+            if unit == 1 and info is not None:
+                info.dpi = (x * 0.0254, y * 0.0254)
+            length -= 9
+        elif chunk_type in (b"IDAT", b"IEND"):
+            # everything we need comes before the pixels
+            return info
+        # skip the rest of the chunk and its crc
+        image_file.seek(length + 4, os.SEEK_CUR)
+
+
+# start of frame markers, the ones that give the image size
+_jpeg_sof_markers = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _read_jpeg(image_file):
+    image_file.seek(2)
+    orientation = 1
+    dpi = None
+    while True:
+        byte = image_file.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = image_file.read(1)
+        while marker == b"\xff":
+            marker = image_file.read(1)
+        if not marker:
+            # truncated file
+            return None
+        marker = ord(marker)
+        # markers without a segment
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        (length,) = struct.unpack(">H", image_file.read(2))
+        segment = image_file.read(length - 2)
+        if len(segment) < length - 2:
+            return None
+
+        if marker == 0xE0 and segment.startswith(b"JFIF\x00") and dpi is None:
+            unit, x, y = struct.unpack(">BHH", segment[7:12])
+            if unit == 1:
+                dpi = (x, y)
+            elif unit == 2:
+                dpi = (x * 2.54, y * 2.54)
+        elif marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            exif = _read_tiff(_bytes_reader(segment[6:]), None)
+            if exif is not None:
+                orientation = exif.orientation
+                dpi = exif.dpi or dpi
+        elif marker in _jpeg_sof_markers:
+            height, width = struct.unpack(">HH", segment[1:5])
+            return ImageInfo(width, height, "JPEG", orientation, dpi)
+
+
+# tiff field types and their sizes
+_tiff_types = {1: "B", 3: "H", 4: "I", 5: "II", 7: "B", 9: "i", 10: "ii"}
+
+
+def _file_reader(image_file):
+    def read(offset, size):
+        image_file.seek(offset)
+        return image_file.read(size)
+    return read
+
+
+def _bytes_reader(data):
+    def read(offset, size):
+        return data[offset : offset + size]
+    return read
+
+
+def _read_tiff(read, format):
+    """
+    reads the first image file directory of tiff data, through read(offset, size).
+    also used for the EXIF segment of jpegs
+    """
+    header = read(0, 8)
+    byte_order = "<" if header[:2] == b"II" else ">"
+    (ifd_offset,) = struct.unpack(byte_order + "I", header[4:8])
+    (entry_count,) = struct.unpack(byte_order + "H", read(ifd_offset, 2))
+    entries = read(ifd_offset + 2, entry_count * 12)
+    tags = {}
+    for i in range(entry_count):
+        entry = entries[i * 12 : i * 12 + 12]
+        tag, field_type, count = struct.unpack(byte_order + "HHI", entry[:8])
+        if tag not in (256, 257, 274, 282, 283, 296) or field_type not in _tiff_types:
+            continue
+        value_format = byte_order + _tiff_types[field_type]
+        value_size = struct.calcsize(value_format)
+        if value_size <= 4:
+            value = struct.unpack(value_format, entry[8 : 8 + value_size])
+        else:
+            (value_offset,) = struct.unpack(byte_order + "I", entry[8:12])
+            value = struct.unpack(value_format, read(value_offset, value_size))
+        # rationals are stored as numerator, denominator
+        tags[tag] = value[0] / value[1] if len(value) == 2 and value[1] else value[0]
+
+    dpi = None
+    if 282 in tags and 283 in tags:
+        # resolution unit: 2 is the inch (and the default), 3 the centimeter
+        unit = tags.get(296, 2)
+        if unit == 2:
+            dpi = (tags[282], tags[283])
+        elif unit == 3:
+            dpi = (tags[282] * 2.54, tags[283] * 2.54)
+    width = tags.get(256)
+    height = tags.get(257)
+    if format is not None and (width is None or height is None):
+        return None
+    return ImageInfo(width, height, format, tags.get(274, 1), dpi)
+
+
+_pdf_object = re.compile(rb"(\d+)\s+\d+\s+obj\b(.*?)\bendobj", re.DOTALL)
+_pdf_root = re.compile(rb"/Root\s+(\d+)\s+\d+\s+R")
+_pdf_reference = re.compile(rb"\s+(\d+)\s+\d+\s+R")
+_pdf_number = re.compile(rb"\s*([-+]?[\d.]+)")
+_pdf_first_kid = re.compile(rb"\s*\[\s*(\d+)\s+\d+\s+R")
+_pdf_box = re.compile(rb"\s*\[\s*([-+\d.]+)\s+([-+\d.]+)\s+([-+\d.]+)\s+([-+\d.]+)\s*\]")
+
+
+def _read_pdf(image_file, max_size=4 * 1024 * 1024):
+    # follows the page tree to the first page, for its MediaBox and Rotate,
+    # which can both be inherited from the parent nodes.
+    # large files, compressed object streams and indirect values are left to drawBot
+    data = image_file.read(max_size + 1)
+    if len(data) > max_size:
+        return None
+    # objects redefined by incremental updates come later in the file
+    objects = {int(number): body for number, body in _pdf_object.findall(data)}
+    roots = _pdf_root.findall(data)
+    if not roots:
+        return None
+    pages = _pdf_value(objects.get(int(roots[-1])), b"/Pages", _pdf_reference)
+    if pages is None:
+        return None
+    node = objects.get(int(pages))
+    media_box = rotate = None
+    # the first kid of each node, down to the first page
+    for _ in range(64):
+        if node is None:
+            return None
+        media_box = _pdf_value(node, b"/MediaBox", _pdf_box) or media_box
+        rotate = _pdf_value(node, b"/Rotate", _pdf_number) or rotate
+        kid = _pdf_value(node, b"/Kids", _pdf_first_kid)
+        if kid is None:
+            break
+        node = objects.get(int(kid))
+    else:
+        return None
+    if media_box is None:
+        return None
+    x_min, y_min, x_max, y_max = (float(value) for value in media_box)
+    width, height = abs(x_max - x_min), abs(y_max - y_min)
+    if rotate is not None and int(float(rotate)) % 180:
+        width, height = height, width
+    return ImageInfo(width, height, "PDF")
+
+
+def _pdf_value(dictionary, key, pattern):
+    # the value of key in a pdf dictionary, as the groups of pattern
+    if dictionary is None:
+        return None
+    for match in re.finditer(re.escape(key) + rb"\b", dictionary):
+        value = pattern.match(dictionary, match.end())
+        if value is not None:
+            groups = value.groups()
+            return groups[0] if len(groups) == 1 else groups
+    return None
@@ -0,0 +1,52 @@
+import math
+from .image_cache import write_atomically
+
+"""
+The pixel work behind imageBox (cropping, resampling), done with Pillow.
+This module doesn't import drawBot, so it can run in worker processes.
+"""
+
+# ----------------------------------------
+
+
+def crop_image(input_path, output_path, crop_rect, output_size=None):
+    """
+    writes the crop_rect part of the image to output_path,
+    resampled to output_size if given
+    """
+    ## moving through PIL here
+    ## as drawBot imageObject.crop
+    ## seems to produce blurred borders
+    from PIL import Image
+
+    crop_x, crop_y, crop_width, crop_height = crop_rect
+    im = Image.open(input_path)
+    image_width, image_height = im.size
+    # PIL counts y from the top of the image
+    top = image_height - crop_y - crop_height
+    box = (crop_x, top, crop_x+crop_width, top+crop_height)
+
+    if output_size is None:
+        im = im.crop(box)
+    else:
+        output_width, output_height = output_size
+        # jpegs can be decoded at 1/2, 1/4 or 1/8 of their size directly,
+        # draft picks the smallest one that is still large enough
+        im.draft(None, (math.ceil(image_width * output_width / crop_width),
+                        math.ceil(image_height * output_height / crop_height)))
+        ratio_x = im.width / image_width
+        ratio_y = im.height / image_height
+        box = (box[0]*ratio_x, box[1]*ratio_y, box[2]*ratio_x, box[3]*ratio_y)
+        im = im.resize(output_size, Image.LANCZOS, box=box, reducing_gap=3.0)
+    im.save(output_path)
+
+
+def process_image(input_path, output_path, crop_rect, output_size=None):
+    """
+    crop_image, written atomically to output_path.
+    this is what worker processes run
+    """
+    def render(temp_path):
+        crop_image(input_path, temp_path, crop_rect, output_size)
+    write_atomically(output_path, render)
+    return output_path
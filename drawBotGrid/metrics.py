@@ -0,0 +1,164 @@
+from .backends import db
+from collections import OrderedDict
+import threading
+
+"""
+Text measurements (textBoxBaselines, fontCapHeight, fontLineHeight, textSize...)
+go through CoreText typesetting, which makes them the slowest calls in a layout.
+The helpers below cache their results, keyed on the current font settings,
+the text and the box, so measuring the same thing twice only typesets once.
+"""
+
+# ----------------------------------------
+
+
+class MetricsCache:
+    """
+    a least recently used cache, with hit and miss counters
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, funct, *args, **kwargs):
+        """
+        returns the cached value for key, or stores and returns funct(*args, **kwargs).
+        a None key bypasses the cache
+        """
+        if not self.enabled or key is None:
+            return funct(*args, **kwargs)
+
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+            self.misses += 1
+
+        value = funct(*args, **kwargs)
+
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "enabled": self.enabled,
+        }
+
+    def __len__(self):
+        return len(self._items)
+
+
+metrics_cache = MetricsCache()
+
+
+def set_metrics_cache_enabled(bool_):
+    metrics_cache.enabled = bool(bool_)
+
+
+metricsCacheEnabled = set_metrics_cache_enabled
+
+
+def clear_metrics_cache():
+    metrics_cache.clear()
+
+
+clearMetricsCache = clear_metrics_cache
+
+
+def metrics_cache_info():
+    return metrics_cache.info()
+
+
+metricsCacheInfo = metrics_cache_info
+
+# ----------------------------------------
+
+def font_state_key(exclude=()):
+    """
+    a hashable snapshot of the current font settings, given by the drawing backend,
+    or None if they can't be read (the cache is then bypassed)
+    """
+    return db.font_state_key(exclude=exclude)
+
+
+def _text_key(name, txt, *args):
+    # FormattedStrings carry their own attributes, they are not cached
+    if not isinstance(txt, str):
+        return None
+    state_key = font_state_key()
+    if state_key is None:
+        return None
+    return (name, state_key, txt) + args
+
+
+def _state_key(name, *args):
+    state_key = font_state_key()
+    if state_key is None:
+        return None
+    return (name, state_key) + args
+
+
+# ----------------------------------------
+
+
+def text_box_baselines(txt, box, align=None):
+    """
+    cached db.textBoxBaselines, returned as a tuple
+    """
+    key = _text_key("textBoxBaselines", txt, tuple(box), align)
+    return metrics_cache.get(key, _text_box_baselines, txt, box, align)
+
+
+def _text_box_baselines(txt, box, align):
+    return tuple(db.textBoxBaselines(txt, box, align=align))
+
+
+def text_overflow(txt, box, align=None):
+    """
+    cached db.textOverflow
+    """
+    key = _text_key("textOverflow", txt, tuple(box), align)
+    return metrics_cache.get(key, db.textOverflow, txt, box, align=align)
+
+
+def text_size(txt, align=None, width=None, height=None):
+    """
+    cached db.textSize
+    """
+    key = _text_key("textSize", txt, align, width, height)
+    return metrics_cache.get(
+        key, db.textSize, txt, align=align, width=width, height=height
+    )
+
+
+def font_cap_height():
+    """
+    cached db.fontCapHeight
+    """
+    return metrics_cache.get(_state_key("fontCapHeight"), db.fontCapHeight)
+
+
+def font_line_height():
+    """
+    cached db.fontLineHeight
+    """
+    return metrics_cache.get(_state_key("fontLineHeight"), db.fontLineHeight)
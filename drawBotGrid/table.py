@@ -1,24 +1,53 @@
-import drawBot as db
-from . import grid, text
+from .backends import db
+from . import grid, text, metrics
+from .geometry import Rect
 
 from collections import UserList
+from collections.abc import Mapping
+from array import array
+import bisect
+import copy
+import itertools
 import math
+import numbers
 
 
 class Table:
+    """
+    items are either a list of row dictionaries,
+    or columns: a dictionary of sequences, a numpy structured array,
+    or a dataframe-like table (pandas, pyarrow...) whose columns can be read with items[title].
+    the columns of a dictionary must all have the same length.
+    anything else implementing the arrow stream or dataframe interchange protocol is read into
+    a pyarrow table or a pandas dataframe first, which requires pyarrow or pandas.
+    the cells are formatted column by column the first time the table is measured or drawn
+
+    columns without a width share the space left evenly, or according to their content
+    if fit_columns is True, see ColumnsManager.fit_to_content.
+
+    column descriptions can have a "format" key, either a format spec applied to each value ("{:,.2f}" style without the braces),
+    or a function that takes the whole column (a list, or the array or series it is stored in) and returns its strings
+    """
+
     def __init__(self, possize, items, column_descriptions,
                  base_row_height=12,
                  margins=6,
-                 header_gap=0):
+                 header_gap=0,
+                 fit_columns=False):
         self.x, self.y, self.width, self.input_height = possize
         self.margins = margins
+        self.fit_columns = fit_columns
+        columnar_items = _as_columnar(items)
+        self.items = list(items) if columnar_items is None else columnar_items
 
         self.columns_manager = ColumnsManager(self, column_descriptions)
-        self.rows_manager = RowsManager(self, items,
+        self.rows_manager = RowsManager(self, self.items,
                                         base_row_height=base_row_height, header_gap=header_gap)
 
-        self.actual_height = self.rows_manager.total_height
         self.vertical_align = False
+        # row heights for other widths than the table's, see paginate
+        self._heights_by_width = {}
+        self._cell_rects = None
 
     # drawers
 
@@ -42,12 +71,10 @@ class Table:
         db.line((self.x+self.width, self.y), (self.x+self.width, self.y+self.height))
 
     def draw_content(self):
+        offset = text_vertical_offset(self.base_row_height)
         for contents, cells in zip(self.cell_values, self.cell_rects):
             for content, cell in zip(contents, cells):
-                if self.vertical_align:
-                    text.verticalAlignTextBox(content, cell.raw_textbox, vertical_align="center")
-                else:
-                    db.textBox(content, cell.textbox)
+                _draw_cell_content(content, cell, self.vertical_align, offset)
 
     def draw_header_background(self):
         db.rect(*self.header_rect)
@@ -55,6 +82,77 @@ class Table:
     def draw_content_background(self):
         db.rect(*self.content_rect)
 
+    # pagination
+
+    def paginate(self, frames):
+        """
+        splits the table across frames, filling each one from its top with as many rows as fit.
+        frames are (x, y, w, h) boxes, or anything with a possize (a Grid, a ColumnGrid...),
+        in any iterable (a generator of pages for instance), read until all rows are placed.
+        the header is repeated in each frame if it is shown.
+        a frame always gets at least one row, even if it is too tall for it.
+        returns (tables, overflow): one Table per frame used, and the items that did not fit in the frames
+        """
+        show_header = self.rows_manager.show_header
+        row_count = len(self.rows_manager.content_values)
+        tables = []
+        start = 0
+        for frame in frames:
+            x, y, w, h = getattr(frame, "possize", frame)
+            header_height, content_heights, cumulative_heights = self._get_row_heights_for_width(w)
+            available_height = h
+            if show_header:
+                available_height -= header_height + self.rows_manager.header_gap
+            # the last row whose bottom is still in the frame
+            # (with a little tolerance for float rounding)
+            end = bisect.bisect_right(cumulative_heights, cumulative_heights[start] + available_height + 1e-9, lo=start + 1) - 1
+            end = min(max(end, start + 1), row_count)
+            tables.append(self._get_sub_table((x, y + h, w, h), start, end, header_height, content_heights))
+            start = end
+            if start >= row_count:
+                break
+        return tables, _slice_items(self.items, start, None)
+
+    def _get_row_heights_for_width(self, width):
+        if width not in self._heights_by_width:
+            rows_manager = self.rows_manager
+            if width == self.width:
+                # the table's own rows are already measured
+                header_height = rows_manager.header_height
+                content_heights = rows_manager.content_heights
+            else:
+                widths = self._get_columns_manager(_TableWidth(self.x, width, self.margins)).widths
+                header_height, *content_heights = rows_manager.measure_rows_heights(rows_manager.rows, widths)
+            cumulative_heights = [0] + list(itertools.accumulate(content_heights))
+            self._heights_by_width[width] = header_height, content_heights, cumulative_heights
+        return self._heights_by_width[width]
+
+    def _get_columns_manager(self, table):
+        # the columns of the table at another position or width
+        columns_manager = ColumnsManager(table, self.columns_manager.column_descriptions)
+        if self.fit_columns:
+            columns_manager.fit_to_content(self.rows_manager.rows, content_widths=self.columns_manager.content_widths)
+        return columns_manager
+
+    def _get_sub_table(self, possize, start, end, header_height, content_heights):
+        table = copy.copy(self)
+        table.x, table.y, table.width, table.input_height = possize
+        table.items = rows_items = _slice_items(self.items, start, end)
+        table._heights_by_width = {}
+        table._cell_rects = None
+        table.columns_manager = self._get_columns_manager(table)
+
+        rows_manager = copy.copy(self.rows_manager)
+        rows_manager.table = table
+        rows_manager.items = rows_items
+        rows_manager.rows = [rows_manager.header_values] + rows_manager.content_values[start:end]
+        rows_manager.header_height = header_height
+        rows_manager.content_heights = content_heights[start:end]
+        rows_manager._heights = None
+        rows_manager._origins = None
+        table.rows_manager = rows_manager
+        return table
+
     # properties
 
     @property
@@ -65,21 +163,26 @@ class Table:
     def show_header(self, value):
         self._show_header = value
         self.rows_manager.show_header = value
+        self._cell_rects = None
     
 
     @property
     def height(self):
         return -self.rows_manager.total_height
 
+    @property
+    def actual_height(self):
+        return self.rows_manager.total_height
+
+    @property
+    def base_row_height(self):
+        return self.rows_manager.base_row_height
+
     @property
     def cell_rects(self):
-        out = []
-        for y, height in zip(self.rows_manager.origins, self.rows_manager.heights):
-            row = []
-            for x, width in zip(self.columns_manager.origins, self.columns_manager.widths):
-                row.append(CellBox(self, (x, y, width, height)))
-            out.append(row)
-        return out
+        if self._cell_rects is None:
+            self._cell_rects = CellRects(self)
+        return self._cell_rects
 
     @property
     def cell_values(self):
@@ -107,6 +210,12 @@ class ColumnsManager:
     WIDTH_KEY = "width"
     TITLE_KEY = "title"
     LABEL_KEY = "label"
+    FORMAT_KEY = "format"
+
+    # fit_to_content only measures that many rows, evenly spread across the table
+    FIT_SAMPLE_SIZE = 1000
+
+    __slots__ = ("table", "column_descriptions", "widths", "origins", "content_widths", "titles")
 
     def __init__(self, parent, column_descriptions):
         self.table = parent
@@ -114,12 +223,13 @@ class ColumnsManager:
 
         self.widths = self._calculate_columns_widths()
         self.origins = self._calculate_columns_origins()
+        self.content_widths = None
 
         self.titles = self._get_column_descriptions_filtered_key()
 
     @property
     def rects(self):
-        return [(x, self.table.y, w, self.table.height) for x, w in zip(self.origins, self.widths)]
+        return [Rect(x, self.table.y, w, self.table.height) for x, w in zip(self.origins, self.widths)]
 
     @property
     def separator_origins(self):
@@ -153,6 +263,63 @@ class ColumnsManager:
             current_x += width
         return origins
 
+    # ----------------------------------------
+    # content fitting
+
+    def fit_to_content(self, rows, content_widths=None):
+        """
+        sizes the columns without a width from their content, the way browsers lay tables out.
+        each one gets at least its longest word and at most its longest line,
+        the space in between being shared in proportion of what each column would need to fit on one line.
+        content_widths are the (min, max) widths of the columns if they are already measured
+        """
+        if content_widths is None:
+            content_widths = self._measure_content_widths(rows)
+        self.content_widths = content_widths
+
+        flex_indexes = [i for i, col in enumerate(self.column_descriptions) if col.get(self.WIDTH_KEY) == None]
+        if not flex_indexes:
+            return
+        available_width = self.table.width - self._get_sum_of_defined_columns_width()
+        flex_widths = _distribute_width([content_widths[i] for i in flex_indexes], available_width)
+        for i, width in zip(flex_indexes, flex_widths):
+            self.widths[i] = width
+        self.origins = self._calculate_columns_origins()
+
+    def _measure_content_widths(self, rows):
+        if len(rows) > self.FIT_SAMPLE_SIZE:
+            # always keep the header
+            step = len(rows) / self.FIT_SAMPLE_SIZE
+            rows = [rows[0]] + [rows[int(i * step)] for i in range(1, self.FIT_SAMPLE_SIZE)]
+
+        # many cells share the same words
+        text_widths = {}
+        def text_width(content):
+            try:
+                return text_widths[content]
+            except KeyError:
+                width = text_widths[content] = metrics.text_size(content)[0]
+                return width
+
+        margins = self.table.margins * 2
+        content_widths = []
+        for column in zip(*rows):
+            min_width = max_width = 0
+            for content in column:
+                if isinstance(content, str):
+                    words = content.split()
+                    if not words:
+                        continue
+                    line_width = text_width(content)
+                    word_width = max(text_width(word) for word in words)
+                else:
+                    # FormattedStrings can't be split into words here
+                    line_width = word_width = metrics.text_size(content)[0]
+                min_width = max(min_width, word_width)
+                max_width = max(max_width, line_width)
+            content_widths.append((min_width + margins, max_width + margins))
+        return content_widths
+
     # ----------------------------------------
     # content helpers
 
@@ -163,22 +330,87 @@ class ColumnsManager:
         return [i.get(self.LABEL_KEY, i[self.TITLE_KEY]) for i in self.column_descriptions]
 
     def filter_row_content(self, row):
-        return [row.get(k, "") for k in self.titles]
+        return [_format_column([row.get(col[self.TITLE_KEY])], col.get(self.FORMAT_KEY))[0]
+                for col in self.column_descriptions]
+
+    def get_columns_content(self, items):
+        """
+        the formatted content of the table, column by column
+        """
+        if _is_columnar(items):
+            length = _get_columnar_length(items)
+            columns = [_get_column(items, title, length) for title in self.titles]
+        else:
+            columns = [[row.get(title) for row in items] for title in self.titles]
+        return [_format_column(column, col.get(self.FORMAT_KEY))
+                for column, col in zip(columns, self.column_descriptions)]
 
 
 class RowsManager:
+    """
+    the items are only formatted, column by column, and measured
+    the first time the rows or their heights are needed
+    """
+
+    __slots__ = ("table", "items", "base_row_height", "header_gap", "_rows", "_header_height", "_content_heights",
+                 "_show_header", "_heights", "_origins", "_cell_heights", "_cell_heights_font_state")
 
     def __init__(self, parent, rows, base_row_height=12, header_gap=0):
         self.table = parent
-        self.rows = [self.table.columns_manager.get_column_labels()] + self.filter_rows_content(rows)
+        self.items = rows
         self.base_row_height = base_row_height
         self.header_gap = header_gap
 
+        self._rows = None
+        self._header_height = None
+        self._content_heights = None
         self._show_header = True
 
-        self.heights = self._calculate_rows_heights()
-        self.origins = self._calculate_rows_origins()
+        # cell heights by (content, width), for the font settings they were measured with
+        self._cell_heights = {}
+        self._cell_heights_font_state = None
+
+        self._heights = None
+        self._origins = None
+
+        if getattr(self.table, "fit_columns", False):
+            # the column widths depend on the content
+            self.table.columns_manager.fit_to_content(self.rows)
 
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = [self.table.columns_manager.get_column_labels()] + self.filter_rows_content(self.items)
+        return self._rows
+
+    @rows.setter
+    def rows(self, value):
+        self._rows = value
+
+    @property
+    def header_height(self):
+        if self._header_height is None:
+            self._measure_heights()
+        return self._header_height
+
+    @header_height.setter
+    def header_height(self, value):
+        self._header_height = value
+
+    @property
+    def content_heights(self):
+        if self._content_heights is None:
+            self._measure_heights()
+        return self._content_heights
+
+    @content_heights.setter
+    def content_heights(self, value):
+        self._content_heights = value
+
+    def _measure_heights(self):
+        # header and content are measured separately,
+        # so that showing or hiding the header doesn't measure anything again
+        self._header_height, *self._content_heights = self.measure_rows_heights(self.rows, self.table.columns_manager.widths)
 
     @property
     def show_header(self):
@@ -187,12 +419,24 @@ class RowsManager:
     @show_header.setter
     def show_header(self, value):
         self._show_header = value
-        self.heights = self._calculate_rows_heights()
-        self.origins = self._calculate_rows_origins()
+        self._heights = None
+        self._origins = None
+
+    @property
+    def heights(self):
+        if self._heights is None:
+            self._heights = self._calculate_rows_heights()
+        return self._heights
+
+    @property
+    def origins(self):
+        if self._origins is None:
+            self._origins = self._calculate_rows_origins()
+        return self._origins
 
     @property
     def rects(self):
-        return [(self.table.x, y, self.table.width, h) for y, h in zip(self.origins, self.heights)]
+        return [Rect(self.table.x, y, self.table.width, h) for y, h in zip(self.origins, self.heights)]
 
     @property
     def separator_origins(self):
@@ -208,19 +452,19 @@ class RowsManager:
 
     @property
     def header_rect(self):
-        return (self.table.x, self.origins[0], self.table.width, self.heights[0])
+        return Rect(self.table.x, self.origins[0], self.table.width, self.heights[0])
 
     @property
     def content_rect(self):
-        return (self.table.x, self.origins[-1], self.table.width, self.content_height)
+        return Rect(self.table.x, self.origins[-1], self.table.width, self.content_height)
 
     @property
     def content_rects(self):
-        return [(self.table.x, y, self.table.width, h) for y, h in zip(self.origins[1:], self.heights[1:])]
+        return [Rect(self.table.x, y, self.table.width, h) for y, h in zip(self.origins[1:], self.heights[1:])]
 
     @property
     def table_rect(self):
-        return (self.table.x, self.origins[-1], self.table.width, self.total_height)
+        return Rect(self.table.x, self.origins[-1], self.table.width, self.total_height)
 
     # ----------------------------------------
 
@@ -243,17 +487,13 @@ class RowsManager:
     # coordinate helpers
 
     def filter_rows_content(self, rows):
-        return [self.table.columns_manager.filter_row_content(row) for row in rows]
+        columns = self.table.columns_manager.get_columns_content(rows)
+        return [list(row) for row in zip(*columns)]
 
     def _calculate_rows_heights(self):
-        heights = []
         if self.show_header:
-            rows = self.rows
-        else:
-            rows = self.rows[1:]
-        for row in rows:
-            heights.append(self._calculate_row_height(row))
-        return heights
+            return [self.header_height] + self.content_heights
+        return list(self.content_heights)
 
     def _calculate_rows_origins(self):
         origins = []
@@ -267,31 +507,375 @@ class RowsManager:
             origins.append(current_y)
         return origins
 
-    def _calculate_cell_height(self, content, width):
-        return db.textSize(content, width=width)[1]
+    def measure_row_height(self, row, widths):
+        return self.measure_rows_heights([row], widths)[0]
+
+    def measure_rows_heights(self, rows, widths):
+        return measure_rows_heights(rows, widths, margins=self.table.margins,
+                                    base_row_height=self.base_row_height, memo=self._get_cell_heights_memo())
+
+    def _get_cell_heights_memo(self):
+        font_state = metrics.font_state_key()
+        if font_state is None or font_state != self._cell_heights_font_state:
+            self._cell_heights = {}
+            self._cell_heights_font_state = font_state
+        return self._cell_heights
+
+# ----------------------------------------
+
+class StreamingTable:
+    """
+    a Table that lays its rows out one at a time, as they are read from items.
+    items can be any iterable of row dictionaries (a generator, a database cursor...),
+    it is only read once.
+    rows() yields TableRows and only keeps the current one in memory,
+    so the first rows can be drawn before the last ones are even read.
+    """
+
+    def __init__(self, possize, items, column_descriptions,
+                 base_row_height=12,
+                 margins=6,
+                 header_gap=0):
+        self.x, self.y, self.width, self.input_height = possize
+        self.items = items
+        self.margins = margins
+        self.base_row_height = base_row_height
+        self.header_gap = header_gap
+
+        self.columns_manager = ColumnsManager(self, column_descriptions)
+
+        self.show_header = True
+        self.vertical_align = False
+
+        self._cell_heights = {}
+        self._cell_heights_font_state = None
+
+    def rows(self):
+        widths = self.columns_manager.widths
+        current_y = self.y
+        if self.show_header:
+            labels = self.columns_manager.get_column_labels()
+            height = self.measure_row_height(labels, widths)
+            current_y -= height
+            yield TableRow(self, labels, current_y, height, is_header=True)
+            current_y -= self.header_gap
+
+        for item in self.items:
+            row = self.columns_manager.filter_row_content(item)
+            height = self.measure_row_height(row, widths)
+            current_y -= height
+            yield TableRow(self, row, current_y, height)
+
+    def measure_row_height(self, row, widths):
+        # repeated values (categories, units, empty cells) are measured once,
+        # the font settings are checked for each row as they can change between two rows
+        return measure_row_height(row, widths, margins=self.margins, base_row_height=self.base_row_height,
+                                  memo=self._get_cell_heights_memo())
+
+    def _get_cell_heights_memo(self):
+        font_state = metrics.font_state_key()
+        if font_state is None or font_state != self._cell_heights_font_state:
+            self._cell_heights = {}
+            self._cell_heights_font_state = font_state
+        return self._cell_heights
+
+    def draw_content(self):
+        """
+        draws the rows as they are laid out, returns the total height of the table
+        """
+        bottom = self.y
+        for row in self.rows():
+            row.draw_content()
+            bottom = row.y
+        return self.y - bottom
+
+
+class TableRow:
+    """
+    a laid out row, y being its bottom
+    """
+
+    __slots__ = ("table", "values", "y", "height", "is_header")
+
+    def __init__(self, parent, values, y, height, is_header=False):
+        self.table = parent
+        self.values = values
+        self.y = y
+        self.height = height
+        self.is_header = is_header
+
+    @property
+    def rect(self):
+        return Rect(self.table.x, self.y, self.table.width, self.height)
+
+    @property
+    def cell_rects(self):
+        columns_manager = self.table.columns_manager
+        return [CellBox(self.table, (x, self.y, width, self.height))
+                for x, width in zip(columns_manager.origins, columns_manager.widths)]
+
+    def draw_content(self):
+        offset = text_vertical_offset(self.table.base_row_height)
+        for content, cell in zip(self.values, self.cell_rects):
+            _draw_cell_content(content, cell, self.table.vertical_align, offset)
+
+    def draw_background(self):
+        db.rect(*self.rect)
 
-    def _calculate_row_height(self, row):
-        vert_margin = (self.base_row_height - db.fontLineHeight()) / 2
-        heights = []
-        for content, width in zip(row, self.table.columns_manager.widths):
-            heights.append(self._calculate_cell_height(content, width - self.table.margins * 2))
-        max_height = max(heights)
-        # return math.ceil(max_height / self.base_row_height) * self.base_row_height
-        return max(max_height + vert_margin * 2, self.base_row_height)
+    def draw_frame(self):
+        db.line((self.table.x, self.y), (self.table.x + self.table.width, self.y))
+        db.line((self.table.x, self.y + self.height), (self.table.x + self.table.width, self.y + self.height))
+
+def _distribute_width(content_widths, available_width):
+    """
+    shares available_width between columns of (min, max) content widths
+    """
+    min_widths = [min_width for min_width, max_width in content_widths]
+    max_widths = [max_width for min_width, max_width in content_widths]
+    total_min = sum(min_widths)
+    total_max = sum(max_widths)
+
+    if available_width >= total_max:
+        # every cell fits on one line, the widest columns get most of the extra space
+        if not total_max:
+            return [available_width / len(content_widths)] * len(content_widths)
+        return [width * available_width / total_max for width in max_widths]
+    if available_width >= total_min:
+        ratio = (available_width - total_min) / (total_max - total_min)
+        return [min_width + (max_width - min_width) * ratio for min_width, max_width in content_widths]
+    # even the longest words don't fit
+    if not total_min:
+        return [available_width / len(content_widths)] * len(content_widths)
+    return [width * available_width / total_min for width in min_widths]
+
+# ----------------------------------------
+# columnar items
+
+def _is_columnar(items):
+    if isinstance(items, Mapping):
+        return True
+    # numpy structured arrays
+    if getattr(getattr(items, "dtype", None), "names", None):
+        return True
+    # pyarrow tables, or pandas and polars dataframes
+    return hasattr(items, "column_names") or (hasattr(items, "columns") and hasattr(items, "__getitem__"))
+
+def _as_columnar(items):
+    """
+    items as columns that can be read by title and sliced, or None if they are rows.
+    objects that only implement the arrow stream or the dataframe interchange protocol
+    (a pyarrow RecordBatchReader, a duckdb relation...) are read into a pyarrow table or a pandas dataframe
+    """
+    if _is_columnar(items):
+        # raises right away if the columns of a dictionary don't have the same length
+        _get_columnar_length(items)
+        return items
+    if hasattr(items, "__arrow_c_stream__"):
+        import pyarrow
+        return pyarrow.table(items)
+    if hasattr(items, "__dataframe__"):
+        import pandas.api.interchange
+        return pandas.api.interchange.from_dataframe(items)
+    return None
+
+def _get_columnar_length(items):
+    if isinstance(items, Mapping):
+        lengths = {title: len(values) for title, values in items.items()}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"the columns of a table must all have the same length, not {lengths}")
+        return next(iter(lengths.values()), 0)
+    return len(items)
+
+def _get_column_names(items):
+    if isinstance(items, Mapping):
+        return items.keys()
+    names = getattr(getattr(items, "dtype", None), "names", None)
+    if names:
+        return names
+    # pyarrow, or pandas and polars
+    names = getattr(items, "column_names", None)
+    if names is None:
+        names = items.columns
+    return names
+
+def _get_column(items, title, length):
+    if title not in _get_column_names(items):
+        return [None] * length
+    return items[title]
+
+def _slice_items(items, start, end):
+    if isinstance(items, Mapping):
+        return {title: values[start:end] for title, values in items.items()}
+    return items[start:end]
+
+def _format_column(values, formatter=None):
+    """
+    the strings of a column. missing values are None, they are left empty
+    and never given to a format spec
+
+    >>> _format_column([3.5, None], ",.2f")
+    ['3.50', '']
+    """
+    if callable(formatter):
+        values = formatter(values)
+    values = _to_list(values)
+    if isinstance(formatter, str):
+        return ["" if value is None else format(value, formatter) for value in values]
+    return [_format_value(value) for value in values]
+
+def _to_list(values):
+    # arrays and series know how to give back python values quickly
+    for method_name in ("to_pylist", "tolist"):
+        method = getattr(values, method_name, None)
+        if method is not None:
+            return method()
+    return list(values)
+
+def _format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, numbers.Number):
+        return str(value)
+    return value
+
+class _TableWidth:
+    """
+    what a ColumnsManager needs to know about its table
+    """
+
+    __slots__ = ("x", "width", "margins")
+
+    def __init__(self, x, width, margins):
+        self.x = x
+        self.width = width
+        self.margins = margins
+
+# ----------------------------------------
+
+def measure_cell_height(content, width):
+    return metrics.text_size(content, width=width)[1]
+
+def measure_cell_heights(contents, width, memo=None):
+    """
+    the heights of many cells of the same width, typically a column,
+    measuring each distinct content only once.
+    memo is a dictionary to keep the measurements between calls, for the same font settings
+    """
+    if memo is None:
+        memo = {}
+    heights = []
+    for content in contents:
+        try:
+            height = memo[(content, width)]
+        except KeyError:
+            height = memo[(content, width)] = measure_cell_height(content, width)
+        except TypeError:
+            # unhashable content
+            height = measure_cell_height(content, width)
+        heights.append(height)
+    return heights
+
+def measure_row_height(row, widths, margins=6, base_row_height=12, memo=None):
+    """
+    the height of a row: its tallest cell plus the vertical margins,
+    never less than base_row_height.
+    memo is the same as for measure_cell_heights
+    """
+    vert_margin = (base_row_height - metrics.font_line_height()) / 2
+    heights = []
+    for content, width in zip(row, widths):
+        heights.extend(measure_cell_heights([content], width - margins * 2, memo=memo))
+    max_height = max(heights)
+    # return math.ceil(max_height / base_row_height) * base_row_height
+    return max(max_height + vert_margin * 2, base_row_height)
+
+def measure_rows_heights(rows, widths, margins=6, base_row_height=12, memo=None):
+    """
+    measure_row_height for many rows, measured column by column
+    """
+    if not rows:
+        return []
+    vert_margin = (base_row_height - metrics.font_line_height()) / 2
+    columns_heights = [measure_cell_heights(column, width - margins * 2, memo=memo)
+                       for column, width in zip(zip(*rows), widths)]
+    return [max(max(heights) + vert_margin * 2, base_row_height) for heights in zip(*columns_heights)]
+
+def _draw_cell_content(content, cell, vertical_align=False, offset=None):
+    if vertical_align:
+        text.verticalAlignTextBox(content, cell.raw_textbox, vertical_align="center")
+    else:
+        db.textBox(content, cell.get_textbox(offset))
+
+def text_vertical_offset(base_row_height):
+    """
+    how much the text of a cell is moved down so that its first line
+    is vertically centered in a row of base_row_height.
+    it only depends on the font settings, so it is cached with the text metrics
+    """
+    key = metrics._state_key("textVerticalOffset", base_row_height)
+    return metrics.metrics_cache.get(key, _calculate_text_vertical_offset, base_row_height)
+
+def _calculate_text_vertical_offset(row_height):
+    # calculate first line offset
+    font_top = metrics.font_cap_height()
+    target_first_line = row_height - (row_height - font_top) / 2 - font_top
+    actual_first_line_x, actual_first_line_y = metrics.text_box_baselines("H", (0, 0, 100, row_height))[0]
+    offset = actual_first_line_y - target_first_line
+    return offset
+
+# ----------------------------------------
+
+class CellRects:
+    """
+    the CellBoxes of a Table, row by row.
+    only the row and column coordinates are stored, CellBoxes are made when a row is read
+    """
+
+    __slots__ = ("table", "row_origins", "row_heights", "column_origins", "column_widths")
+
+    def __init__(self, parent):
+        self.table = parent
+        self.row_origins = array("d", parent.rows_manager.origins)
+        self.row_heights = array("d", parent.rows_manager.heights)
+        self.column_origins = array("d", parent.columns_manager.origins)
+        self.column_widths = array("d", parent.columns_manager.widths)
+
+    def __len__(self):
+        return len(self.row_origins)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        y = self.row_origins[index]
+        height = self.row_heights[index]
+        return [CellBox(self.table, (x, y, width, height))
+                for x, width in zip(self.column_origins, self.column_widths)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+# ----------------------------------------
 
 class CellBox:
 
+    __slots__ = ("table", "x", "y", "width", "height")
+
     def __init__(self, parent, possize):
         self.table = parent
         self.x, self.y, self.width, self.height = possize
 
     @property
     def rect(self):
-        return (self.x, self.y, self.width, self.height)
+        return Rect(self.x, self.y, self.width, self.height)
 
     @property
     def textbox(self):
-        offset = self._get_text_vertical_offset()
+        return self.get_textbox()
+
+    def get_textbox(self, offset=None):
+        if offset is None:
+            offset = self._get_text_vertical_offset()
         return (self.x + self.table.margins, self.y - offset, self.width - self.table.margins * 2, self.height)
 
     @property
@@ -301,10 +885,4 @@ class CellBox:
     # ----------------------------------------
 
     def _get_text_vertical_offset(self):
-        row_height = self.table.rows_manager.base_row_height
-        # calculate first line offset
-        font_top = db.fontCapHeight()
-        target_first_line = row_height - (row_height - font_top) / 2 - font_top
-        actual_first_line_x, actual_first_line_y = db.textBoxBaselines("H", (0, 0, 100, row_height))[0]
-        offset = actual_first_line_y - target_first_line
-        return offset
+        return text_vertical_offset(self.table.base_row_height)
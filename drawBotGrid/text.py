@@ -1,22 +1,116 @@
-import drawBot as db
+from .backends import db
 from .grid import ColumnGrid
+from . import metrics
+import contextlib
+import contextvars
 import math
+import re
 
 # ----------------------------------------
 
-_textbox_funct = db.textBox
+# the overflow test mode is held in a context variable, so that each thread
+# or asyncio task can measure text without turning off drawing for the others
+_text_overflow_test_mode = contextvars.ContextVar(
+    "text_overflow_test_mode", default=False
+)
 
 
 def set_text_overflow_test_mode(bool_):
-    global _textbox_funct
-    if bool_ == False:
-        _textbox_funct = db.textBox
-    else:
-        _textbox_funct = db.textOverflow
+    _text_overflow_test_mode.set(bool(bool_))
 
 
 textOverflowTestMode = set_text_overflow_test_mode
 
+
+@contextlib.contextmanager
+def text_overflow_test(bool_=True):
+    """
+    turns the overflow test mode on (or off) for the duration of a with block,
+    in the current thread or task only
+    """
+    token = _text_overflow_test_mode.set(bool(bool_))
+    try:
+        yield
+    finally:
+        _text_overflow_test_mode.reset(token)
+
+
+textOverflowTest = text_overflow_test
+
+
+def _textbox_funct(txt, box, align=None):
+    if _text_overflow_test_mode.get():
+        return metrics.text_overflow(txt, box, align=align)
+    return db.textBox(txt, box, align=align)
+
+
+# ----------------------------------------
+
+
+class TextBoxLayout:
+    """
+    a text box whose position has been worked out, but that is not drawn yet.
+
+    box is the final box, after the vertical shift,
+    line_height is the lineHeight the text is drawn with (None keeps the current one),
+    column is the index of the column the box fills in a column layout.
+    baselines and overflow are only filled in by the *_layout functions
+    """
+
+    def __init__(self, txt, box, shift=0, align=None, line_height=None, column=0):
+        self.txt = txt
+        self.box = box
+        self.shift = shift
+        self.align = align
+        self.line_height = line_height
+        self.column = column
+        self.baselines = ()
+        self.overflow = None
+
+    def _lay_out(self, funct):
+        with db.savedState():
+            if self.line_height is not None:
+                db.lineHeight(self.line_height)
+            return funct(self.txt, self.box, align=self.align)
+
+    def measure(self):
+        self.baselines = self._lay_out(metrics.text_box_baselines)
+        if self.overflow is None:
+            self.overflow = self._lay_out(metrics.text_overflow)
+
+    def draw(self):
+        return self._lay_out(_textbox_funct)
+
+
+class TextLayout:
+    """
+    the measured layout of a text in one or several boxes, returned by the *_layout functions.
+    drawing it later skips all the measuring the drawing functions do,
+    as long as the font settings are the same as when it was measured
+    """
+
+    def __init__(self, boxes, overflow):
+        self.boxes = boxes
+        self.overflow = overflow
+
+    @property
+    def lines(self):
+        """
+        the (x, y, column) of every line baseline
+        """
+        return [(x, y, box.column) for box in self.boxes for x, y in box.baselines]
+
+    def draw(self):
+        for box in self.boxes:
+            box.draw()
+        return self.overflow
+
+
+def _measured_layout(box_layout):
+    box_layout.measure()
+    return TextLayout([box_layout], box_layout.overflow)
+
+
 # ----------------------------------------
 
 
@@ -29,6 +123,57 @@ def baseline_grid_textBox(
     vertical_align="top",
     direction="ltr",
 ):
+    return _baseline_grid_textBox_layout(
+        txt,
+        box,
+        baseline_grid,
+        align_first_line_only=align_first_line_only,
+        align=align,
+        vertical_align=vertical_align,
+        direction=direction,
+    ).draw()
+
+
+baselineGridTextBox = baseline_grid_textBox
+
+
+def baseline_grid_textBox_layout(
+    txt,
+    box,
+    baseline_grid,
+    align_first_line_only=False,
+    align="left",
+    vertical_align="top",
+    direction="ltr",
+):
+    """
+    same as baseline_grid_textBox, but returns a TextLayout instead of drawing
+    """
+    return _measured_layout(
+        _baseline_grid_textBox_layout(
+            txt,
+            box,
+            baseline_grid,
+            align_first_line_only=align_first_line_only,
+            align=align,
+            vertical_align=vertical_align,
+            direction=direction,
+        )
+    )
+
+
+baselineGridTextBoxLayout = baseline_grid_textBox_layout
+
+
+def _baseline_grid_textBox_layout(
+    txt,
+    box,
+    baseline_grid,
+    align_first_line_only=False,
+    align="left",
+    vertical_align="top",
+    direction="ltr",
+):
 
     assert vertical_align in ("top", "bottom", "center")
 
@@ -41,18 +186,19 @@ def baseline_grid_textBox(
 
         x, y, w, h = box
 
+        line_height = None
         if not align_first_line_only:
-            actual_line_height = db.fontLineHeight()
+            actual_line_height = metrics.font_line_height()
             target_line_height = (
                 math.ceil(actual_line_height / baseline_grid.line_height)
                 * baseline_grid.line_height
             )
-            set_metric_baseline_height(target_line_height)
+            line_height = set_metric_baseline_height(target_line_height)
 
-        absolute_cap_height = db.fontCapHeight()
+        absolute_cap_height = metrics.font_cap_height()
 
         if vertical_align == "top":
-            first_line_y = db.textBoxBaselines(txt, box)[0][1]
+            first_line_y = metrics.text_box_baselines(txt, box)[0][1]
             current_cap_y = first_line_y + absolute_cap_height
             cap_distance_from_top = y + h - current_cap_y
 
@@ -64,13 +210,13 @@ def baseline_grid_textBox(
             shift = target_line - first_line_y
 
         elif vertical_align == "bottom":
-            last_line_y = db.textBoxBaselines(txt, box)[-1][1]
+            last_line_y = metrics.text_box_baselines(txt, box)[-1][1]
             target_line = baseline_grid.closest_line_above_coordinate(y)
             shift = target_line - last_line_y
 
         elif vertical_align == "center":
             # maybe there is more refined solution here
-            lines = db.textBoxBaselines(txt, box)
+            lines = metrics.text_box_baselines(txt, box)
             mid_line_index = int(len(lines) / 2)
             mid_line_y = lines[mid_line_index][1]
             target_line = baseline_grid.closest_line_below_coordinate(
@@ -78,12 +224,11 @@ def baseline_grid_textBox(
             )
             shift = target_line - mid_line_y
 
-        overflow = _textbox_funct(txt, (x, y + shift, w, h), align=align)
-        return overflow
+        return TextBoxLayout(
+            txt, (x, y + shift, w, h), shift=shift, align=align, line_height=line_height
+        )
 
 
-baselineGridTextBox = baseline_grid_textBox
-
 # ----------------------------------------
 
 
@@ -106,6 +251,28 @@ def column_textBox(
 columnTextBox = column_textBox
 
 
+def column_textBox_layout(
+    txt, box, subdivisions=2, gutter=10, align="left", direction="ltr"
+):
+    """
+    same as column_textBox, but returns a TextLayout instead of drawing
+    """
+    layout, columns = _column_textBox_layout(
+        txt,
+        box,
+        baseline_grid=None,
+        subdivisions=subdivisions,
+        gutter=gutter,
+        align=align,
+        direction=direction,
+        measure=True,
+    )
+    return layout
+
+
+columnTextBoxLayout = column_textBox_layout
+
+
 def column_baseline_grid_textBox(
     txt,
     box,
@@ -133,7 +300,37 @@ def column_baseline_grid_textBox(
 columnBaselineGridTextBox = column_baseline_grid_textBox
 
 
-def _column_textBox_base(
+def column_baseline_grid_textBox_layout(
+    txt,
+    box,
+    baseline_grid,
+    align_first_line_only=False,
+    subdivisions=2,
+    gutter=10,
+    align="left",
+    direction="ltr",
+):
+    """
+    same as column_baseline_grid_textBox, but returns a TextLayout instead of drawing
+    """
+    layout, columns = _column_textBox_layout(
+        txt,
+        box,
+        baseline_grid,
+        align_first_line_only=align_first_line_only,
+        subdivisions=subdivisions,
+        gutter=gutter,
+        align=align,
+        direction=direction,
+        measure=True,
+    )
+    return layout
+
+
+columnBaselineGridTextBoxLayout = column_baseline_grid_textBox_layout
+
+
+def _column_textBox_layout(
     txt,
     box,
     baseline_grid=None,
@@ -141,8 +338,8 @@ def _column_textBox_base(
     subdivisions=2,
     gutter=10,
     align="left",
-    draw_grid=False,
     direction="ltr",
+    measure=False,
 ):
 
     columns = ColumnGrid(
@@ -165,11 +362,16 @@ def _column_textBox_base(
         # For LTR, normal left to right order
         column_indices = range(subdivisions)
 
+    # each column only typesets the start of the remaining text it needs,
+    # see _get_overflowing_chunk
+    box_layouts = []
+    chunk_length = _estimate_chunk_length(columns.column_width, columns.height)
+
     for col_index in column_indices:
         if len(overflow) > 0:
             # In RTL mode, we need to adjust the x position
             # columns[col_index] already gives the right edge of the column in RTL mode
-            # (see grid.py AbstractGutterGrid.__getitem__)
+            # (see geometry.py AbstractGutterGrid.__getitem__)
             if direction == "rtl":
                 # For RTL, columns[col_index] returns the right edge
                 # We need to position the textbox so its right edge aligns with column's right edge
@@ -183,11 +385,55 @@ def _column_textBox_base(
                 sub_box = (col, columns.bottom, columns.column_width, columns.height)
 
             if baseline_grid:
-                overflow = baseline_grid_textBox(
-                    overflow, sub_box, baseline_grid, align=align, direction=direction
-                )
+
+                def column_layout(txt):
+                    return _baseline_grid_textBox_layout(
+                        txt, sub_box, baseline_grid, align=align, direction=direction
+                    )
+
             else:
-                overflow = _textbox_funct(overflow, sub_box, align=align)
+
+                def column_layout(txt):
+                    return TextBoxLayout(txt, sub_box, align=align)
+
+            box_layout, visible_length = _get_overflowing_chunk(
+                overflow, chunk_length, column_layout
+            )
+            overflow = overflow[visible_length:]
+            chunk_length = visible_length + visible_length // 4 + 16
+
+            box_layout.column = col_index
+            box_layout.overflow = overflow
+            if measure:
+                box_layout.measure()
+            box_layouts.append(box_layout)
+
+    return TextLayout(box_layouts, overflow), columns
+
+
+def _column_textBox_base(
+    txt,
+    box,
+    baseline_grid=None,
+    align_first_line_only=False,
+    subdivisions=2,
+    gutter=10,
+    align="left",
+    draw_grid=False,
+    direction="ltr",
+):
+    layout, columns = _column_textBox_layout(
+        txt,
+        box,
+        baseline_grid,
+        align_first_line_only=align_first_line_only,
+        subdivisions=subdivisions,
+        gutter=gutter,
+        align=align,
+        direction=direction,
+    )
+    layout.draw()
+    overflow = layout.overflow
 
     if draw_grid:
         grid_color = (0.5, 0, 0.8, 1)
@@ -233,6 +479,51 @@ def _column_textBox_base(
     return overflow
 
 
+# ----------------------------------------
+
+_whitespace_regex = re.compile(r"\s")
+
+
+def _estimate_chunk_length(width, height):
+    """
+    a generous guess of the number of characters a box can show,
+    _get_overflowing_chunk extends it if it is too short
+    """
+    line_height = max(metrics.font_line_height(), 1)
+    return int(4 * abs(width * height) / line_height**2) + 64
+
+
+def _get_overflowing_chunk(txt, chunk_length, column_layout):
+    """
+    returns the shortest start of txt, cut after a whitespace and at least chunk_length long,
+    that still overflows the box, along with the length of text the box shows.
+
+    the lines that fit in a box only depend on the text up to the first word that doesn't,
+    so a chunk that overflows is laid out in the box exactly like the whole text,
+    and typesetting it only costs what the box shows instead of the whole remaining text.
+
+    column_layout(txt) should return the TextBoxLayout of txt in the box.
+    returns the TextBoxLayout of the chunk rather than the chunk itself
+    """
+    while True:
+        chunk = _cut_after_whitespace(txt, chunk_length)
+        box_layout = column_layout(chunk)
+        chunk_overflow = box_layout._lay_out(metrics.text_overflow)
+        if len(chunk_overflow) > 0 or len(chunk) == len(txt):
+            return box_layout, len(chunk) - len(chunk_overflow)
+        chunk_length *= 2
+
+
+def _cut_after_whitespace(txt, length):
+    # FormattedStrings are not cut, they carry formatting that may depend on their length
+    if not isinstance(txt, str) or length >= len(txt):
+        return txt
+    whitespace = _whitespace_regex.search(txt, length)
+    if whitespace is None:
+        return txt
+    return txt[: whitespace.end()]
+
+
 # ----------------------------------------
 
 
@@ -257,6 +548,33 @@ def _draw_point(xy, radius=2):
 
 
 def vertical_align_textBox(txt, box, align=None, vertical_align="top", direction="ltr"):
+    return _vertical_align_textBox_layout(
+        txt, box, align=align, vertical_align=vertical_align, direction=direction
+    ).draw()
+
+
+verticalAlignTextBox = vertical_align_textBox
+
+
+def vertical_align_textBox_layout(
+    txt, box, align=None, vertical_align="top", direction="ltr"
+):
+    """
+    same as vertical_align_textBox, but returns a TextLayout instead of drawing
+    """
+    return _measured_layout(
+        _vertical_align_textBox_layout(
+            txt, box, align=align, vertical_align=vertical_align, direction=direction
+        )
+    )
+
+
+verticalAlignTextBoxLayout = vertical_align_textBox_layout
+
+
+def _vertical_align_textBox_layout(
+    txt, box, align=None, vertical_align="top", direction="ltr"
+):
 
     assert vertical_align in ("top", "bottom", "center")
 
@@ -266,10 +584,10 @@ def vertical_align_textBox(txt, box, align=None, vertical_align="top", direction
 
     x, y, w, h = correct_box_direction(box)
 
-    absolute_cap_height = db.fontCapHeight()
+    absolute_cap_height = metrics.font_cap_height()
 
     if vertical_align == "top":
-        first_line_y = db.textBoxBaselines(txt, box)[0][1]
+        first_line_y = metrics.text_box_baselines(txt, box)[0][1]
         current_cap_y = first_line_y + absolute_cap_height
         cap_distance_from_top = y + h - current_cap_y
         highest_possible_first_line = first_line_y + cap_distance_from_top
@@ -277,13 +595,13 @@ def vertical_align_textBox(txt, box, align=None, vertical_align="top", direction
         shift = target_line - first_line_y
 
     elif vertical_align == "bottom":
-        last_line_y = db.textBoxBaselines(txt, box)[-1][1]
+        last_line_y = metrics.text_box_baselines(txt, box)[-1][1]
         target_line = y
         shift = target_line - last_line_y
 
     elif vertical_align == "center":
         # maybe there is more refined solution here
-        lines = db.textBoxBaselines(txt, box)
+        lines = metrics.text_box_baselines(txt, box)
 
         top = lines[0][1] + absolute_cap_height
         bottom = lines[-1][1]
@@ -291,12 +609,7 @@ def vertical_align_textBox(txt, box, align=None, vertical_align="top", direction
         margin = (h - text_h) / 2
         shift = y + margin - bottom
 
-    box = (x, y + shift, w, h)
-    overflow = _textbox_funct(txt, box, align=align)
-    return overflow
-
-
-verticalAlignTextBox = vertical_align_textBox
+    return TextBoxLayout(txt, (x, y + shift, w, h), shift=shift, align=align)
 
 
 # ----------------------------------------
@@ -313,17 +626,148 @@ baselineHeight = set_metric_baseline_height
 
 
 def _get_line_height_from_desired_baseline_height(baseline_height):
+    # the correction only depends on the font settings and the baseline height,
+    # the current lineHeight is overwritten by the probe anyway
+    state_key = metrics.font_state_key(exclude=("lineHeight",))
+    key = None
+    if state_key is not None:
+        key = ("baselineHeight", state_key, baseline_height)
+    return metrics.metrics_cache.get(
+        key, _probe_line_height_from_desired_baseline_height, baseline_height
+    )
+
+
+def _probe_line_height_from_desired_baseline_height(baseline_height):
     with db.savedState():
         txt = "H\nH"
         db.lineHeight(baseline_height)
-        # should calculate appropriate size here
-        lines = db.textBoxBaselines(txt, (0, 0, 10000, 10000))
+        # the probe box only needs to fit two lines of a single glyph
+        probe_size = 4 * max(abs(baseline_height), db.fontLineHeight())
+        lines = db.textBoxBaselines(txt, (0, 0, probe_size, probe_size))
+        if len(lines) < 2:
+            lines = db.textBoxBaselines(txt, (0, 0, 10000, 10000))
         line_dist = lines[0][1] - lines[1][1]
         target_line_dist = baseline_height
         required_line_dist = target_line_dist - line_dist + target_line_dist
     return required_line_dist
 
 
+# ----------------------------------------
+
+_fit_parameters = ("fontSize", "tracking", "lineHeight")
+
+
+def fit_text_to_box(
+    txt,
+    box,
+    min_value,
+    max_value,
+    parameter="fontSize",
+    line_height_ratio=None,
+    tolerance=0.1,
+    align=None,
+):
+    """
+    finds the largest value of parameter ("fontSize", "tracking" or "lineHeight")
+    between min_value and max_value for which txt fits in box, nothing is drawn.
+    the skia backend can't fit the tracking.
+
+    when fitting the fontSize, line_height_ratio keeps the lineHeight proportional to it.
+    returns the fitted settings as a dict, for instance {"fontSize": 11.3, "lineHeight": 14.7, "fits": True},
+    "fits" is False if the text overflows even at min_value
+    """
+
+    def overflows():
+        return len(metrics.text_overflow(txt, box, align=align)) > 0
+
+    return _fit_parameter(
+        overflows, min_value, max_value, parameter, line_height_ratio, tolerance
+    )
+
+
+fitTextToBox = fit_text_to_box
+
+
+def fit_column_textBox(
+    txt,
+    box,
+    min_value,
+    max_value,
+    parameter="fontSize",
+    line_height_ratio=None,
+    tolerance=0.1,
+    subdivisions=2,
+    gutter=10,
+    baseline_grid=None,
+    align="left",
+    direction="ltr",
+):
+    """
+    same as fit_text_to_box, for columnTextBox,
+    or columnBaselineGridTextBox if a baseline_grid is given
+    """
+
+    def overflows():
+        overflow = _column_textBox_base(
+            txt,
+            box,
+            baseline_grid=baseline_grid,
+            subdivisions=subdivisions,
+            gutter=gutter,
+            align=align,
+            direction=direction,
+        )
+        return len(overflow) > 0
+
+    with text_overflow_test():
+        return _fit_parameter(
+            overflows, min_value, max_value, parameter, line_height_ratio, tolerance
+        )
+
+
+fitColumnTextBox = fit_column_textBox
+
+
+def _fit_parameter(
+    overflows, min_value, max_value, parameter, line_height_ratio, tolerance
+):
+    """
+    bisects parameter over the overflow status, assuming larger values overflow sooner
+    """
+    assert parameter in _fit_parameters
+    assert min_value <= max_value
+    assert tolerance > 0
+    if not hasattr(db, parameter):
+        # drawbot-skia has no tracking
+        raise ValueError(f"fitting {parameter} is not supported by the {db.name} backend")
+
+    def settings_for(value):
+        settings = {parameter: value}
+        if parameter == "fontSize" and line_height_ratio is not None:
+            settings["lineHeight"] = value * line_height_ratio
+        return settings
+
+    def fits(value):
+        with db.savedState():
+            for name, setting in settings_for(value).items():
+                getattr(db, name)(setting)
+            return not overflows()
+
+    if fits(max_value):
+        return dict(settings_for(max_value), fits=True)
+    if not fits(min_value):
+        return dict(settings_for(min_value), fits=False)
+
+    low, high = min_value, max_value
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle
+    return dict(settings_for(low), fits=True)
+
+
 # ----------------------------------------
 
 
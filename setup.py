@@ -21,10 +21,14 @@ setup(name="drawBotGrid",
       license="All rights reserved",
       packages=[
         "drawBotGrid",
+        "drawBotGrid.backends",
         ],
       install_requires=[
         #"drawBot",
 
       ],
+      extras_require={
+        "skia": ["drawbot-skia"],
+      },
       include_package_data=True,
       zip_safe=False)
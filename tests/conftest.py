@@ -0,0 +1,11 @@
+import pytest
+
+from drawBotGrid import drawingBackend
+
+
+@pytest.fixture(autouse=True)
+def backend():
+    """
+    the recording stub, so that the tests run without drawBot
+    """
+    return drawingBackend("stub")
@@ -0,0 +1,27 @@
+import pytest
+
+from drawBotGrid import geometry
+from drawBotGrid.grid import ColumnGrid, Grid, BaselineGrid
+
+
+def test_draw_color_override(backend, monkeypatch):
+    strokes = []
+    monkeypatch.setattr(backend, "stroke", lambda *color: strokes.append(color))
+    columns = ColumnGrid((0, 0, 100, 100), 4, 10)
+    columns.draw_color = (0, 0, 0, 1)
+    columns.draw()
+    assert strokes == [(0, 0, 0, 1)]
+    # the other grids keep the class default
+    assert ColumnGrid((0, 0, 100, 100), 4).draw_color == (1, 0, 1, 1)
+    assert BaselineGrid((0, 0, 100, 100), 12).draw_color == (0, 1, 1, 1)
+
+
+def test_geometry_keeps_its_slots():
+    with pytest.raises(AttributeError):
+        geometry.ColumnGrid((0, 0, 100, 100), 4).draw_color = (0, 0, 0, 1)
+
+
+def test_cell_unpacks_as_rect():
+    grid = Grid((0, 0, 100, 100), 4, 4)
+    x, y, width, height = grid.cell(1, 2, column_span=2)
+    assert (x, y, width, height) == (grid.columns[1], grid.rows[2], grid.columns * 2, grid.rows * 1)
@@ -0,0 +1,46 @@
+import pytest
+
+from drawBotGrid import imageBoxLayout, imageInfo
+
+
+def write_pdf(path, page_size=(600, 800), rotate=0):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 /MediaBox [0 0 %d %d] >>" % page_size,
+        b"<< /Type /Page /Parent 2 0 R /Rotate %d >>" % rotate,
+    ]
+    data = b"%PDF-1.4\n"
+    for number, body in enumerate(objects, 1):
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    data += b"trailer\n<< /Size 4 /Root 1 0 R >>\n%%EOF\n"
+    path.write_bytes(data)
+    return path
+
+
+def test_pdf_size(tmp_path):
+    assert imageInfo(write_pdf(tmp_path / "page.pdf")).size == (600, 800)
+    assert imageInfo(write_pdf(tmp_path / "rotated.pdf", rotate=90)).size == (800, 600)
+
+
+def test_pdf_with_target_dpi_is_clipped(tmp_path):
+    path = write_pdf(tmp_path / "page.pdf")
+    layout = imageBoxLayout(path, (0, 0, 60, 60), target_dpi=72, crop_pixels=True)
+    assert layout.path == path
+    assert layout.clip_rect is not None
+
+
+def test_url_with_crop_pixels_is_clipped(backend, monkeypatch):
+    monkeypatch.setattr(backend, "imageSize", lambda path: (600, 800), raising=False)
+    url = "https://example.com/image.png"
+    layout = imageBoxLayout(url, (0, 0, 60, 60), fitting="fill", crop_pixels=True)
+    assert layout.path == url
+    assert layout.clip_rect is not None
+
+
+def test_png_with_target_dpi_is_resampled(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "big.png"
+    Image.new("RGB", (600, 800)).save(path)
+    layout = imageBoxLayout(path, (0, 0, 60, 80), target_dpi=72)
+    with Image.open(layout.path) as image:
+        assert image.size == (60, 80)
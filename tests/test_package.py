@@ -0,0 +1,19 @@
+import importlib
+
+import pytest
+
+import drawBotGrid
+
+
+@pytest.mark.parametrize("name", ["grid", "text", "table", "image", "geometry"])
+def test_submodules_are_attributes(name):
+    assert drawBotGrid.__getattr__(name) is importlib.import_module(f"drawBotGrid.{name}")
+
+
+def test_grid_attribute():
+    assert drawBotGrid.grid.Grid is drawBotGrid.Grid
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        drawBotGrid.notAThing
@@ -0,0 +1,18 @@
+import pytest
+
+from drawBotGrid.table import Table
+
+columns = [{"title": "name"}, {"title": "value", "format": ",.2f"}]
+
+
+def test_columns_of_different_lengths():
+    with pytest.raises(ValueError):
+        Table((0, 800, 300, 0), {"name": ["a", "b", "c"], "value": [1.5]}, columns)
+
+
+def test_columns_and_rows_give_the_same_cells():
+    rows = [{"name": "a", "value": 1.5}, {"name": "b"}]
+    by_columns = Table((0, 800, 300, 0), {"name": ["a", "b"], "value": [1.5, None]}, columns)
+    by_rows = Table((0, 800, 300, 0), rows, columns)
+    assert by_columns.cell_values == by_rows.cell_values == [["name", "value"], ["a", "1.50"], ["b", ""]]
+    assert by_columns.actual_height == by_rows.actual_height